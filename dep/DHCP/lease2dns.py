@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+import os
+import sys
+import re
+import csv
+import io
+import json
+import time
+import socket
+import argparse
+import ipaddress
+import subprocess
+import http.client
+import urllib.parse
+
+# ================= CONFIGURATION =================
+LEASE_FILE = "/var/lib/kea/kea-leases4.csv"
+KEA_CONF = "/etc/kea/kea-dhcp4.conf"
+NAMED_CONF_LOCAL = "/etc/bind/named.conf.local"
+HANDLER = "/root/.services/handler.py"
+DNS_SOCKET = "/run/dns-handler.sock"
+DOMAIN = "pine.local.br"
+DEBOUNCE = 5.0         # flush once no lease changed for this many seconds...
+MAX_DELAY = 30.0       # ...or when the oldest pending change is this old
+MAX_BATCH = 2000       # ...or when this many hosts are pending
+POLL_INTERVAL = 1.0
+READ_CHUNK = 1024 * 1024
+LEASE_ACTIVE = "0"     # Kea lease state: 0 default, 1 declined, 2 expired-reclaimed
+RECORDS_PAGE = 1000    # page size for the daemon's GET /records (its maximum)
+# =================================================
+
+RE_LABEL = re.compile(r'^[a-z0-9]([a-z0-9-]{0,61}[a-z0-9])?$')
+RE_ZONE = re.compile(r'zone\s+"([^"]+)"')
+RE_CONF_COMMENT = re.compile(r'^\s*//.*$', re.MULTILINE)
+
+def parse_arguments():
+    epilog_text = """EXAMPLES:
+  1. Follow the Kea lease file and register hosts in DNS:
+     ./lease2dns.py
+
+  2. Register what is in the lease file now and exit:
+     ./lease2dns.py --once
+
+  3. Measure parsing/diffing throughput on synthetic lease churn:
+     ./lease2dns.py --bench 200000
+    """
+    parser = argparse.ArgumentParser(
+        description='Kea DHCPv4 lease to DNS (A/PTR) registration',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=epilog_text
+    )
+    parser.add_argument('--lease-file', default=LEASE_FILE, help=f'Kea memfile lease CSV (default: {LEASE_FILE}).')
+    parser.add_argument('--kea-conf', default=KEA_CONF, help='Kea configuration, used for host reservations.')
+    parser.add_argument('--domain', default=DOMAIN, help=f'Forward zone for A records (default: {DOMAIN}).')
+    parser.add_argument('--once', action='store_true', help='Process the current lease file once and exit.')
+    parser.add_argument('--dry-run', action='store_true', help='Print the batches instead of applying them.')
+    parser.add_argument('--bench', type=int, metavar='ROWS',
+                        help='Run the throughput benchmark with ROWS synthetic lease updates.')
+    return parser.parse_args()
+
+# ================= LEASE FILE =================
+
+class LeaseFile:
+    """Reads the memfile lease CSV incrementally by byte offset.
+
+    Kea appends one row per lease change. Its lease file cleanup (LFC) replaces
+    the file with a compacted copy; a new inode or a shorter file restarts the
+    read from the header.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.inode = None
+        self.offset = 0
+        self.header = None
+        self.partial = b""
+
+    def read(self, limit=None):
+        """Returns (rows, reset). `reset` is True when the file was replaced and read from scratch.
+
+        `limit` stops at that byte offset (used to replay a growing file in --bench).
+        """
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return [], False
+
+        reset = False
+        if st.st_ino != self.inode or st.st_size < self.offset:
+            reset = self.inode is not None
+            self.inode, self.offset, self.header, self.partial = st.st_ino, 0, None, b""
+        if st.st_size == self.offset:
+            return [], reset
+
+        rows = []
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            while limit is None or self.offset < limit:
+                size = READ_CHUNK if limit is None else min(READ_CHUNK, limit - self.offset)
+                chunk = f.read(size)
+                if not chunk:
+                    break
+                self.offset += len(chunk)
+                data = self.partial + chunk
+                end = data.rfind(b"\n") + 1
+                self.partial = data[end:]
+                rows.extend(self._parse(data[:end]))
+        return rows, reset
+
+    def _parse(self, data):
+        reader = csv.reader(io.StringIO(data.decode('utf-8', errors='replace')))
+        for row in reader:
+            if not row:
+                continue
+            if self.header is None:
+                self.header = row
+                continue
+            yield dict(zip(self.header, row))
+
+# ================= LEASE STATE =================
+
+def host_label(hostname, domain):
+    """Reduces a lease hostname to a label of `domain`; None if it is not usable."""
+    name = hostname.strip().rstrip('.').lower()
+    if not name:
+        return None
+    if name.endswith("." + domain):
+        name = name[:-len(domain) - 1]
+    if "." in name or not RE_LABEL.match(name):
+        return None
+    return name
+
+class LeaseTable:
+    """Current address -> host mapping, updated row by row; tracks which hosts changed."""
+
+    def __init__(self, domain):
+        self.domain = domain
+        self.by_address = {}   # address -> (host, expire)
+        self.by_host = {}      # host -> (address, expire)
+        self.static = {}       # host -> address, from Kea reservations
+
+    def add_reservations(self, reservations):
+        for host, address in reservations.items():
+            self.static[host] = address
+            self.by_host[host] = (address, float('inf'))
+
+    def apply(self, row, changed):
+        address = row.get('address')
+        host = host_label(row.get('hostname') or "", self.domain)
+        if not address or not host:
+            return
+        try:
+            expire = int(row.get('expire') or 0)
+        except ValueError:
+            expire = 0
+
+        if row.get('state', LEASE_ACTIVE) != LEASE_ACTIVE:
+            # Declined or reclaimed: forget the lease but keep the host's record.
+            if self.by_address.get(address, (None,))[0] == host:
+                del self.by_address[address]
+            return
+
+        self.by_address[address] = (host, expire)
+        if host in self.static:
+            return
+        current = self.by_host.get(host)
+        # A host with several leases keeps the one that expires last.
+        if current is None or current[0] == address or expire >= current[1]:
+            if current is None or current[0] != address:
+                changed.add(host)
+            self.by_host[host] = (address, expire)
+
+    def address(self, host):
+        entry = self.by_host.get(host)
+        return entry[0] if entry else None
+
+# ================= DNS PUBLISHING =================
+
+def load_reservations(kea_conf, domain):
+    """Host reservations (hostname + ip-address) from the Kea configuration."""
+    try:
+        with open(kea_conf, 'r') as f:
+            config = json.loads(RE_CONF_COMMENT.sub('', f.read()))
+    except (OSError, ValueError):
+        return {}
+    reservations = {}
+    for subnet in config.get('Dhcp4', {}).get('subnet4', []):
+        for reservation in subnet.get('reservations', []):
+            host = host_label(reservation.get('hostname') or "", domain)
+            if host and reservation.get('ip-address'):
+                reservations[host] = reservation['ip-address']
+    return reservations
+
+def managed_zones():
+    """Zones configured in BIND, to know which reverse zones can take PTR records."""
+    try:
+        with open(NAMED_CONF_LOCAL, 'r') as f:
+            return [zone.lower().rstrip('.') for zone in RE_ZONE.findall(f.read())]
+    except OSError:
+        return []
+
+def reverse_zone_for(address, zones):
+    reverse = ipaddress.ip_address(address).reverse_pointer
+    for zone in sorted(zones, key=len, reverse=True):
+        if zone.endswith(".arpa") and (reverse == zone or reverse.endswith("." + zone)):
+            return reverse
+    return None
+
+def build_records(hosts, table, domain, zones):
+    records = []
+    for host in sorted(hosts):
+        address = table.address(host)
+        if not address:
+            continue
+        # Absolute names, so the handler files them under --domain rather than its default zone.
+        records.append({'host': f"{host}.{domain}.", 'type': "A", 'value': address, 'comment': "DHCP"})
+        reverse = reverse_zone_for(address, zones)
+        if reverse:
+            records.append({'host': reverse + ".", 'type': "PTR", 'value': f"{host}.{domain}.", 'comment': "DHCP"})
+    return records
+
+class DaemonConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout=330):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+def daemon_request(method, url, payload=None):
+    conn = DaemonConnection(DNS_SOCKET)
+    try:
+        body = json.dumps(payload).encode() if payload is not None else None
+        conn.request(method, url, body=body, headers={'Content-Type': 'application/json'})
+        response = conn.getresponse()
+        return response.status, json.loads(response.read() or b"{}")
+    finally:
+        conn.close()
+
+def published_records(domain):
+    """host -> address already in `domain`, so a restart does not re-push everything."""
+    published = {}
+    offset = 0
+    # GET /records is paged: follow next_offset until the last page.
+    while offset is not None:
+        try:
+            status, data = daemon_request('GET', f'/records?zone={urllib.parse.quote(domain)}&type=A&limit={RECORDS_PAGE}&offset={offset}')
+        except (OSError, http.client.HTTPException, ValueError):
+            return {}
+        if status != 200:
+            return {}
+        published.update((record['host'].lower(), record['value']) for record in data.get('records', []))
+        offset = data.get('next_offset')
+    return published
+
+def push_records(records):
+    """Applies one batch: through the handler daemon if it runs, else one handler.py --batch call."""
+    payload = json.dumps(records)
+    try:
+        status, data = daemon_request('POST', '/records', records)
+        if status == 200:
+            return True
+        print(f"Error: DNS daemon rejected the batch ({status}): {data.get('error') or data.get('output')}")
+        return False
+    except (OSError, http.client.HTTPException, ValueError):
+        pass
+
+    result = subprocess.run([HANDLER, "--batch", "-"], input=payload, capture_output=True, text=True)
+    if result.returncode != 0:
+        print(f"Error: handler.py failed:\n{result.stdout}{result.stderr}")
+        return False
+    return True
+
+# ================= WATCH LOOP =================
+
+class Registrar:
+    """Debounces lease changes and pushes them to DNS in batches."""
+
+    def __init__(self, domain, sink, published=None, zones=()):
+        self.domain = domain
+        self.sink = sink
+        self.table = LeaseTable(domain)
+        self.published = dict(published or {})
+        self.zones = list(zones)
+        self.pending = set()
+        self.first_change = None
+        self.last_change = None
+        self.batches = 0
+
+    def feed(self, rows, now):
+        changed = set()
+        for row in rows:
+            self.table.apply(row, changed)
+        changed = {host for host in changed if self.published.get(host) != self.table.address(host)}
+        if changed:
+            self.pending |= changed
+            self.first_change = self.first_change or now
+            self.last_change = now
+
+    def due(self, now):
+        if not self.pending:
+            return False
+        return (now - self.last_change >= DEBOUNCE or now - self.first_change >= MAX_DELAY
+                or len(self.pending) >= MAX_BATCH)
+
+    def flush(self):
+        hosts = {host for host in self.pending if self.published.get(host) != self.table.address(host)}
+        self.pending, self.first_change, self.last_change = set(), None, None
+        if not hosts:
+            return
+        records = build_records(hosts, self.table, self.domain, self.zones)
+        if self.sink(records):
+            self.batches += 1
+            for host in hosts:
+                self.published[host] = self.table.address(host)
+        else:
+            # Keep them for the next window instead of dropping the changes.
+            self.pending = hosts
+            self.first_change = self.last_change = time.time()
+
+def print_batch(records):
+    print(json.dumps(records, indent=2))
+    return True
+
+def run(args):
+    sink = print_batch if args.dry_run else push_records
+    registrar = Registrar(args.domain, sink, published_records(args.domain), managed_zones())
+    reservations = load_reservations(args.kea_conf, args.domain)
+    registrar.table.add_reservations(reservations)
+    registrar.pending |= {host for host, address in reservations.items()
+                          if registrar.published.get(host) != address}
+    registrar.first_change = registrar.last_change = time.time() if registrar.pending else None
+
+    lease_file = LeaseFile(args.lease_file)
+    print(f"Following {args.lease_file} for zone {args.domain}")
+    while True:
+        rows, reset = lease_file.read()
+        if reset:
+            print("Lease file replaced (LFC); re-reading from the start.")
+        now = time.time()
+        registrar.feed(rows, now)
+        if args.once:
+            registrar.flush()
+            return
+        if registrar.due(now):
+            count = len(registrar.pending)
+            registrar.flush()
+            print(f"Pushed {count} host(s) in batch #{registrar.batches}")
+        time.sleep(POLL_INTERVAL)
+
+# ================= BENCHMARK =================
+
+def bench(rows):
+    """Synthetic churn on vlan714: VMs renewing, some moving to a new address, replayed as the file grows."""
+    import random
+    import tempfile
+
+    header = "address,hwaddr,client_id,valid_lifetime,expire,subnet_id,fqdn_fwd,fqdn_rev,hostname,state,user_context,pool_id\n"
+    hosts = 250
+    rng = random.Random(1)
+    addresses = {host: f"172.16.14.{host + 1}" for host in range(hosts)}
+    started = int(time.time())
+    with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+        f.write(header)
+        for i in range(rows):
+            host = rng.randrange(hosts)
+            if rng.random() < 0.1:
+                addresses[host] = f"172.16.14.{rng.randrange(1, 254)}"
+            f.write(f"{addresses[host]},00:16:3e:00:{host // 256:02x}:{host % 256:02x},,3600,{started + i},2,0,0,"
+                    f"vm{host}.{DOMAIN},0,,0\n")
+        path = f.name
+
+    pushed = []
+    registrar = Registrar(DOMAIN, lambda records: pushed.append(len(records)) or True,
+                          zones=[DOMAIN, "14.16.172.in-addr.arpa"])
+    lease_file = LeaseFile(path)
+    size = os.path.getsize(path)
+    step = max(1, size // 600)  # ~10 minutes of polls, one simulated second each
+    total = 0
+    now = 0.0
+    try:
+        t0 = time.perf_counter()
+        while lease_file.offset < size:
+            batch, _ = lease_file.read(limit=lease_file.offset + step)
+            total += len(batch)
+            registrar.feed(batch, now)
+            if registrar.due(now):
+                registrar.flush()
+            now += POLL_INTERVAL
+        registrar.flush()
+        elapsed = time.perf_counter() - t0
+    finally:
+        os.remove(path)
+
+    print(f"Lease rows:      {total}")
+    print(f"Elapsed:         {elapsed:.3f} s ({total / elapsed:,.0f} rows/s)")
+    print(f"Batches pushed:  {len(pushed)} over {now:.0f} simulated seconds "
+          f"(one sign + reload each, instead of one per lease change)")
+    print(f"Records pushed:  {sum(pushed)}")
+
+def main():
+    args = parse_arguments()
+    if args.bench:
+        bench(args.bench)
+        sys.exit(0)
+    if os.geteuid() != 0 and not args.dry_run:
+        print("Error: This script must be run as root.")
+        sys.exit(1)
+    try:
+        run(args)
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -8,15 +8,49 @@ import pwd
 import grp
 import secrets
 import argparse
-import shutil
-from datetime import datetime
+import csv
+import io
+import json
+import ipaddress
+import time
+import functools
+import hashlib
+import tempfile
+import fcntl
+import threading
+import contextlib
+import atexit
+import fnmatch
+import multiprocessing
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler
+from socketserver import ThreadingUnixStreamServer
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlparse, parse_qs
 
 # ================= CONFIGURATION =================
 NAMED_CONF_LOCAL = "/etc/bind/named.conf.local"
 NAMED_CONF_OPTIONS = "/etc/bind/named.conf.options"
 KEYS_DIR = "/etc/bind/keys"
+STATE_DIR = "/var/lib/dnssec-handler"
 BIND_USER = "bind"
 BIND_GROUP = "bind"
+RECORD_TYPES = ("A", "AAAA", "CNAME", "PTR")
+SIGNING_MODES = ("offline", "inline")
+SIG_VALIDITY = 30 * 86400  # RRSIG lifetime requested from dnssec-signzone (seconds)
+SIG_REFRESH = 7 * 86400    # --rollover re-signs offline zones this long before RRSIGs expire
+ZSK_LIFETIME = 90 * 86400
+KSK_LIFETIME = 365 * 86400
+PROPAGATION_DELAY = 3600   # added to the zone's largest TTL between rollover phases
+KSK_DS_WAIT = 3 * 86400    # time allowed to update the DS at the parent during a KSK rollover
+DAEMON_SOCKET = "/run/dns-handler.sock"
+DAEMON_SOCKET_GROUP = "spiral-dns" # only the web UI service user belongs to it (see dep/Web/note.sh)
+DAEMON_COALESCE_DELAY = 2.0       # seconds to collect a burst of edits into one sign + reload
+DAEMON_WATCH_INTERVAL = 5.0       # seconds between checks for external file edits
+DAEMON_REQUEST_TIMEOUT = 300
+RECORDS_PAGE_SIZE = 100          # default and maximum page size of the daemon's GET /records
+RECORDS_MAX_PAGE = 1000
+TIMING_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)  # histogram upper bounds (seconds) for --timings
 # =================================================
 
 def check_root():
@@ -25,6 +59,7 @@ def check_root():
         print("Error: This script must be run as root.")
         sys.exit(1)
 
+@functools.lru_cache(maxsize=None)
 def get_bind_uid_gid():
     """Retrieves the UID and GID for the bind user."""
     try:
@@ -35,6 +70,173 @@ def get_bind_uid_gid():
         print(f"Error: User or group '{BIND_USER}' not found on this system.")
         sys.exit(1)
 
+# ================= ATOMIC FILE WRITES =================
+# named must never see a half-written file: content goes to a temp file in the
+# same directory, is fsync'd and renamed over the target. Writers of the same
+# file serialise on an advisory lock, and identical content is not rewritten so
+# callers can skip the validate/sign/restart cycle for no-op changes.
+
+@contextlib.contextmanager
+def file_lock(name):
+    """Advisory lock (under STATE_DIR) shared by CLI runs, the daemon and the rollover timer."""
+    os.makedirs(STATE_DIR, mode=0o700, exist_ok=True)
+    with open(os.path.join(STATE_DIR, f"{name}.lock"), 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        yield
+
+def file_digest(path):
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+def atomic_write(path, content, mode=0o644, owner=None):
+    """Replaces `path` with `content` atomically. Returns False if the file already had that content."""
+    data = content.encode() if isinstance(content, str) else content
+    if file_digest(path) == hashlib.sha256(data).hexdigest():
+        return False
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, mode)
+        if owner:
+            os.chown(tmp_path, *owner)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    # Persist the rename itself.
+    dir_fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+    return True
+
+# ================= TIMINGS =================
+# Each phase (key check, zone rewrite, sign, checkconf, reload/restart) is timed
+# into an in-process histogram. When a run ends the histograms are added to
+# STATE_DIR/timings.json, so --timings reports totals across CLI runs, worker
+# processes and the daemon.
+
+TIMED_PHASES = {}
+_timings_lock = threading.Lock()
+
+def empty_histogram():
+    # buckets[i] counts durations <= TIMING_BUCKETS[i]; the extra last slot is +Inf.
+    return {'buckets': [0] * (len(TIMING_BUCKETS) + 1), 'count': 0, 'sum': 0.0, 'max': 0.0, 'failures': 0}
+
+def record_timing(phase, seconds, failed=False):
+    index = next((i for i, bound in enumerate(TIMING_BUCKETS) if seconds <= bound), len(TIMING_BUCKETS))
+    with _timings_lock:
+        hist = TIMED_PHASES.setdefault(phase, empty_histogram())
+        hist['buckets'][index] += 1
+        hist['count'] += 1
+        hist['sum'] += seconds
+        hist['max'] = max(hist['max'], seconds)
+        hist['failures'] += int(failed)
+
+@contextlib.contextmanager
+def timed(phase):
+    """Times a block (or, as a decorator, a function); sys.exit(1) and exceptions count as failures."""
+    start = time.perf_counter()
+    failed = True
+    try:
+        yield
+        failed = False
+    except SystemExit as e:
+        failed = bool(e.code)
+        raise
+    finally:
+        record_timing(phase, time.perf_counter() - start, failed)
+
+def merge_histogram(total, hist):
+    total['buckets'] = [a + b for a, b in zip(total['buckets'], hist['buckets'])]
+    for field in ('count', 'sum', 'failures'):
+        total[field] += hist[field]
+    total['max'] = max(total['max'], hist['max'])
+
+def merge_timings(phases):
+    """Adds histograms recorded elsewhere (a pool worker) to this process's timings."""
+    with _timings_lock:
+        for phase, hist in phases.items():
+            merge_histogram(TIMED_PHASES.setdefault(phase, empty_histogram()), hist)
+
+def timings_file():
+    return os.path.join(STATE_DIR, "timings.json")
+
+def load_timings():
+    try:
+        with open(timings_file(), 'r') as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    # Totals recorded with other bucket bounds cannot be merged.
+    return saved.get('phases', {}) if saved.get('bounds') == list(TIMING_BUCKETS) else {}
+
+def flush_timings():
+    """Adds this process's timings to STATE_DIR/timings.json."""
+    with _timings_lock:
+        pending = dict(TIMED_PHASES)
+        TIMED_PHASES.clear()
+    if not pending:
+        return
+    try:
+        with file_lock("timings"):
+            phases = load_timings()
+            for phase, hist in pending.items():
+                merge_histogram(phases.setdefault(phase, empty_histogram()), hist)
+            atomic_write(timings_file(), json.dumps({
+                'bounds': list(TIMING_BUCKETS),
+                'updated': int(time.time()),
+                'phases': phases,
+            }, indent=2, sort_keys=True), 0o600)
+    except OSError as e:
+        print(f"Warning: could not save timings ({e}).", file=sys.stderr)
+
+def bucket_quantile(hist, q):
+    """Upper bound of the bucket holding the q-quantile (the observed max for the +Inf bucket)."""
+    rank = q * hist['count']
+    seen = 0
+    for bound, n in zip(TIMING_BUCKETS, hist['buckets']):
+        seen += n
+        if seen >= rank:
+            return min(bound, hist['max'])
+    return hist['max']
+
+def timings_report():
+    phases = load_timings()
+    with _timings_lock:
+        for phase, hist in TIMED_PHASES.items():
+            merge_histogram(phases.setdefault(phase, empty_histogram()), hist)
+    report = {}
+    for phase, hist in sorted(phases.items()):
+        if not hist['count']:
+            continue
+        cumulative, buckets = 0, {}
+        for bound, n in zip(list(TIMING_BUCKETS) + ["+Inf"], hist['buckets']):
+            cumulative += n
+            buckets[str(bound)] = cumulative
+        report[phase] = {
+            'count': hist['count'],
+            'failures': hist['failures'],
+            'sum': round(hist['sum'], 3),
+            'mean': round(hist['sum'] / hist['count'], 3),
+            'max': round(hist['max'], 3),
+            'p50': round(bucket_quantile(hist, 0.5), 3),
+            'p95': round(bucket_quantile(hist, 0.95), 3),
+            'buckets': buckets,
+        }
+    return report
+
 def parse_arguments():
     epilog_text = """EXAMPLES:
   1. List current forwarders:
@@ -43,14 +245,44 @@ def parse_arguments():
   2. Set new forwarders (Use commas, NO spaces or slashes):
      ./handler.py --set-fwd "1.1.1.1,8.8.8.8"
 
-  3. Add a new A record:
+  3. Add a new A record (AAAA is detected from IPv6 values):
      ./handler.py --record "srv01,192.168.1.10,File Server"
+     ./handler.py --type CNAME --record "files,srv01,Alias for srv01"
 
-  4. List zone records:
+  4. List zone records (all zones, or one), filter them or export them:
      ./handler.py --list
+     ./handler.py --list --zone 14.16.172.in-addr.arpa
+     ./handler.py --list --host "srv*" --address 192.168.1.0/24
+     ./handler.py --list --format csv > records.csv
+     ./handler.py --list --type PTR --format json
+
+  Records go to the zone their name belongs to: relative names use the first
+  forward zone, absolute names (trailing dot) and PTR addresses are routed:
+     ./handler.py --type PTR --record "172.16.14.5,vm1.pine.local.br.,VM"
 
-  5. Force key rotation (Maintenance):
+  5. Start a key rollover now (Maintenance):
      ./handler.py --rotate-keys
+     ./handler.py --rollover     (advances rollover phases; run by dnssec-rollover.timer)
+
+  6. Let named sign changes incrementally (inline-signing):
+     ./handler.py --signing-mode inline
+
+  7. Apply many records at once (one sign + one reload):
+     ./handler.py --batch hosts.csv
+     cat hosts.json | ./handler.py --batch -
+     CSV columns: HOSTNAME,VALUE,COMMENT or a header line with host,value,type,comment
+     JSON: [{"host": "srv01", "value": "192.168.1.10", "type": "A", "comment": "File Server"}]
+
+  8. Show DNSSEC key and signature status:
+     ./handler.py --status
+
+  9. Run as a daemon (records/forwarders over a local API, edits coalesced):
+     ./handler.py --daemon
+     curl --unix-socket /run/dns-handler.sock http://localhost/records
+     curl --unix-socket /run/dns-handler.sock -X POST -d '[{"host": "srv01", "value": "192.168.1.10"}]' http://localhost/records
+
+  10. Show how long key checks, zone rewrites, signing, checkconf and reloads take:
+     ./handler.py --timings
     """
     
     parser = argparse.ArgumentParser(
@@ -63,9 +295,17 @@ def parse_arguments():
     
     # Zone Actions
     group.add_argument('--list', action='store_true', 
-                        help='List all A records configured in the zone.')
+                        help='List all A/AAAA/CNAME/PTR records configured in the zone.')
     group.add_argument('--rotate-keys', action='store_true',
-                        help='Force DNSSEC key rotation (ZSK/KSK), update serial, and re-sign zone.')
+                        help='Start a ZSK/KSK rollover now; old keys stay published until their TTLs expire.')
+    group.add_argument('--daemon', action='store_true',
+                        help=f'Run as a service with a local JSON API on {DAEMON_SOCKET}.')
+    group.add_argument('--rollover', action='store_true',
+                        help='Advance scheduled key rollovers and refresh signatures if due (run from a timer).')
+    group.add_argument('--status', action='store_true',
+                        help='Show signing mode, NSEC3 salt, key timings and signature expiry.')
+    group.add_argument('--timings', action='store_true',
+                        help='Print a JSON report of phase durations (histograms) recorded by previous runs.')
     
     # Forwarder Actions
     group.add_argument('--list-fwd', action='store_true',
@@ -73,12 +313,38 @@ def parse_arguments():
     group.add_argument('--set-fwd', type=str,
                         help='Set new DNS forwarders. Format: "IP1,IP2"')
 
+    # Zone selection
+    parser.add_argument('--zone', type=str,
+                        help='Zone to act on (default: every zone in named.conf.local; records are '
+                             'routed by name, relative names go to the first forward zone).')
+
     # Record Management
     parser.add_argument('--record', action='append', 
-                        help='Add or Update an A record. Format: "HOSTNAME,IP,COMMENT"')
+                        help='Add or Update a record. Format: "HOSTNAME,VALUE,COMMENT"')
+    parser.add_argument('--type', choices=RECORD_TYPES, type=str.upper,
+                        help='Record type for --record entries (default: A or AAAA, from the value); '
+                             'with --list, only records of this type.')
+
+    # Listing
+    parser.add_argument('--format', choices=LIST_FORMATS, default="table",
+                        help='Output of --list: table (default), or json/csv with every selected zone in one document.')
+    parser.add_argument('--host', type=str,
+                        help='With --list, only hosts matching this pattern (e.g. "web*").')
+    parser.add_argument('--address', type=str,
+                        help='With --list, only A/AAAA/PTR records for this IP or CIDR (e.g. 172.16.14.0/24).')
+    parser.add_argument('--batch', type=str, metavar='FILE',
+                        help='Add or Update records from a CSV/JSON file ("-" reads stdin).')
+
+    # Signing
+    parser.add_argument('--signing-mode', choices=SIGNING_MODES,
+                        help='offline: re-sign with dnssec-signzone on every change (default). '
+                             'inline: named signs only the changed RRsets (inline-signing).')
+    parser.add_argument('--rotate-salt', action='store_true',
+                        help='Generate a new NSEC3 salt on this run (offline mode keeps the salt stable otherwise).')
     
     return parser.parse_args()
 
+@timed("restart")
 def restart_service():
     """Restarts BIND9 using systemctl (No reload, No RNDC)."""
     print("Restarting BIND9 service...")
@@ -95,6 +361,44 @@ def restart_service():
         print("CRITICAL: Failed to restart BIND9 service.")
         sys.exit(1)
 
+@timed("reload")
+def reload_zone(domain, load_keys=False):
+    """Reloads a single zone via rndc, keeping named up. Falls back to a restart."""
+    if load_keys:
+        # Inline-signed zones pick up new or retired keys from the key directory.
+        subprocess.run(["rndc", "loadkeys", domain], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    print(f"Reloading zone {domain}...")
+    try:
+        result = subprocess.run(["rndc", "reload", domain], capture_output=True, text=True)
+    except FileNotFoundError:
+        result = None
+
+    if result is not None and result.returncode == 0:
+        print("Success: Zone reloaded.")
+        return
+
+    details = result.stderr.strip() if result is not None else "rndc not found"
+    print(f"Warning: rndc reload failed ({details}). Falling back to a full restart.")
+    restart_service()
+
+@timed("reconfig")
+def reload_config():
+    """Re-reads named.conf (options such as forwarders) via rndc, keeping named up. Falls back to a restart."""
+    print("Reloading BIND9 configuration...")
+    try:
+        result = subprocess.run(["rndc", "reconfig"], capture_output=True, text=True)
+    except FileNotFoundError:
+        result = None
+
+    if result is not None and result.returncode == 0:
+        print("Success: Configuration reloaded.")
+        return
+
+    details = result.stderr.strip() if result is not None else "rndc not found"
+    print(f"Warning: rndc reconfig failed ({details}). Falling back to a full restart.")
+    restart_service()
+
 # ================= FORWARDERS LOGIC =================
 
 def validate_ip_format(ip_string):
@@ -113,24 +417,42 @@ def validate_ip_format(ip_string):
             return False
     return True
 
+RE_FORWARDERS = re.compile(r'(forwarders\s*\{)([^}]+)(\};)', re.DOTALL)
+
+def forwarders_from_match(match):
+    # Comments like "# Cloudflare" are not addresses.
+    lines = [line.split('#', 1)[0].split('//', 1)[0] for line in match.group(2).splitlines()]
+    raw_ips = " ".join(lines).replace(';', ' ')
+    return [ip for ip in raw_ips.split() if ip.strip()]
+
+def read_forwarders():
+    """Returns the configured forwarders, or None when there is no forwarders block."""
+    with open(NAMED_CONF_OPTIONS, 'r') as f:
+        match = RE_FORWARDERS.search(f.read())
+    return forwarders_from_match(match) if match else None
+
 def manage_forwarders(action, new_ips_str=None):
     if not os.path.isfile(NAMED_CONF_OPTIONS):
         print(f"Error: Configuration file {NAMED_CONF_OPTIONS} not found.")
         sys.exit(1)
 
+    if action == 'set':
+        with file_lock(os.path.basename(NAMED_CONF_OPTIONS)), timed("forwarders"):
+            return _manage_forwarders(action, new_ips_str)
+    return _manage_forwarders(action, new_ips_str)
+
+def _manage_forwarders(action, new_ips_str=None):
     with open(NAMED_CONF_OPTIONS, 'r') as f:
         content = f.read()
 
-    regex_fwd = re.compile(r'(forwarders\s*\{)([^}]+)(\};)', re.DOTALL)
+    regex_fwd = RE_FORWARDERS
     match = regex_fwd.search(content)
 
     if action == 'list':
         print(f"{'CURRENT FORWARDERS':<20}")
         print("-" * 30)
         if match:
-            raw_ips = match.group(2).replace(';', ' ').replace('\n', ' ')
-            ips = [ip for ip in raw_ips.split() if ip.strip()]
-            for ip in ips:
+            for ip in forwarders_from_match(match):
                 print(f" -> {ip}")
         else:
             print("No 'forwarders' block found in configuration.")
@@ -152,94 +474,826 @@ def manage_forwarders(action, new_ips_str=None):
         new_inner_content = " " + "; ".join(ip_list) + "; "
         new_content = regex_fwd.sub(r'\1' + new_inner_content + r'\3', content)
 
-        shutil.copy(NAMED_CONF_OPTIONS, NAMED_CONF_OPTIONS + ".bak")
-        
-        with open(NAMED_CONF_OPTIONS, 'w') as f:
-            f.write(new_content)
+        if new_content == content:
+            print(f"Forwarders already set to: {', '.join(ip_list)} (no changes)")
+            return
+
+        mode = os.stat(NAMED_CONF_OPTIONS).st_mode & 0o777
+        atomic_write(NAMED_CONF_OPTIONS + ".bak", content, mode)
+        atomic_write(NAMED_CONF_OPTIONS, new_content, mode)
         
         print(f"Forwarders configuration updated to: {', '.join(ip_list)}")
         
-        check = subprocess.run(["named-checkconf", NAMED_CONF_OPTIONS], capture_output=True)
+        with timed("checkconf"):
+            check = subprocess.run(["named-checkconf", NAMED_CONF_OPTIONS], capture_output=True)
         if check.returncode != 0:
             print("CRITICAL ERROR: The new configuration is invalid.")
             print(check.stderr.decode())
             print("Restoring backup...")
-            shutil.move(NAMED_CONF_OPTIONS + ".bak", NAMED_CONF_OPTIONS)
+            atomic_write(NAMED_CONF_OPTIONS, content, mode)
             sys.exit(1)
             
-        restart_service()
+        reload_config()
 
 # ================= ZONE & DNSSEC LOGIC =================
 
-def extract_zone_info():
+def make_record(host, value, comment='', rtype=None):
+    """Builds a record dict, inferring A/AAAA from the value when no type is given. Raises ValueError."""
+    host, value = str(host).strip(), str(value).strip()
+    rtype = (rtype or '').strip().upper()
+    if not rtype:
+        try:
+            rtype = "AAAA" if ipaddress.ip_address(value).version == 6 else "A"
+        except ValueError:
+            raise ValueError(f"Cannot infer record type for '{host}' from '{value}'. Use --type or a 'type' column.")
+    return {'host': host, 'type': rtype, 'value': value, 'comment': str(comment or '').strip()}
+
+def parse_record_spec(item, rtype=None):
+    """Parses a "HOSTNAME,VALUE,COMMENT" string into a record dict."""
+    parts = item.split(',')
+    if len(parts) < 3:
+        print(f"Error: Invalid record format '{item}'. Must be: HOSTNAME,VALUE,COMMENT")
+        sys.exit(1)
+    try:
+        return make_record(parts[0], parts[1], ",".join(parts[2:]), rtype)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+def records_from_json(data):
+    """Builds records from decoded JSON: a list of entries or {"records": [...]}. Raises ValueError."""
+    if isinstance(data, dict):
+        data = data.get('records', [])
+    if not isinstance(data, list):
+        raise ValueError("Expected a list of records")
+    records = []
+    for entry in data:
+        value = entry.get('value', entry.get('ip')) if isinstance(entry, dict) else None
+        if not value or not entry.get('host'):
+            raise ValueError(f"Invalid batch entry {entry!r}. Required keys: host, value (or ip)")
+        records.append(make_record(entry['host'], value, entry.get('comment', ''), entry.get('type')))
+    return records
+
+def records_from_csv(content):
+    """Builds records from CSV text (optional host,value,type,comment header). Raises ValueError."""
+    records = []
+    rows = [row for row in csv.reader(io.StringIO(content))
+            if row and not row[0].strip().startswith('#')]
+    header = None
+    if rows and rows[0][0].strip().lower() in ('host', 'hostname'):
+        header = [column.strip().lower() for column in rows.pop(0)]
+
+    for row in rows:
+        if header:
+            entry = dict(zip(header, (cell.strip() for cell in row)))
+            value = entry.get('value') or entry.get('ip')
+            host = entry.get('host') or entry.get('hostname')
+            if not host or not value:
+                raise ValueError(f"Invalid CSV row {row!r}.")
+            records.append(make_record(host, value, entry.get('comment', ''), entry.get('type')))
+        else:
+            if len(row) < 2:
+                raise ValueError(f"Invalid CSV row {row!r}. Must be: HOSTNAME,VALUE[,COMMENT]")
+            records.append(make_record(row[0], row[1], ",".join(row[2:])))
+    return records
+
+def load_batch_records(source):
+    """Reads records from a CSV or JSON file (or stdin when source is '-')."""
+    try:
+        if source == '-':
+            content = sys.stdin.read()
+        else:
+            with open(source, 'r') as f:
+                content = f.read()
+    except OSError as e:
+        print(f"Error: Could not read batch file '{source}': {e}")
+        sys.exit(1)
+
+    if content.lstrip().startswith(('[', '{')):
+        try:
+            data = json.loads(content)
+        except ValueError as e:
+            print(f"Error: Invalid JSON in batch file: {e}")
+            sys.exit(1)
+        try:
+            return records_from_json(data)
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+
+    try:
+        return records_from_csv(content)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+def validate_record(record):
+    """Checks that the record value matches its type."""
+    rtype, value = record['type'], record['value']
+    if rtype not in RECORD_TYPES:
+        return f"unsupported record type '{rtype}'"
+    if rtype in ("A", "AAAA"):
+        try:
+            version = ipaddress.ip_address(value).version
+        except ValueError:
+            return f"'{value}' is not a valid IP address"
+        if (rtype == "A") != (version == 4):
+            return f"'{value}' is not a valid {rtype} value"
+    elif not re.match(r"^[A-Za-z0-9_.-]+$", value):
+        return f"'{value}' is not a valid host name"
+    if not re.match(r"^(@|\*|[A-Za-z0-9_*.-]+)$", record['host']):
+        return f"'{record['host']}' is not a valid owner name"
+    return None
+
+def merge_records(records):
+    """Validates records and keeps only the last change per (host, type)."""
+    merged = {}
+    for record in records:
+        error = validate_record(record)
+        if error:
+            print(f"Error: {record['host']} {record['type']}: {error}.")
+            sys.exit(1)
+        merged[(record['host'].lower(), record['type'])] = record
+    return list(merged.values())
+
+RE_ZONE_STANZA = re.compile(r'zone\s+"([^"]+)"\s*(?:IN\s*)?\{', re.IGNORECASE)
+
+def zone_stanza_body(content, start):
+    """Text between the stanza's opening brace (at `start`) and its matching closing brace."""
+    depth = 1
+    for pos in range(start, len(content)):
+        if content[pos] == '{':
+            depth += 1
+        elif content[pos] == '}':
+            depth -= 1
+            if depth == 0:
+                return content[start:pos]
+    return content[start:]
+
+def extract_zones():
+    """Every primary zone in named.conf.local as (domain, unsigned zone file), in file order."""
     if not os.path.isfile(NAMED_CONF_LOCAL):
         print(f"Error: {NAMED_CONF_LOCAL} not found.")
         sys.exit(1)
-    
+
     with open(NAMED_CONF_LOCAL, 'r') as f:
         content = f.read()
-        domain_match = re.search(r'zone\s+"([^"]+)"', content)
-        file_match = re.search(r'file\s+"([^"]+)"', content)
-        
-        if domain_match and file_match:
-            zone_file = file_match.group(1).replace(".signed", "")
-            return domain_match.group(1).lower(), zone_file
-            
-    print("Error: Could not extract domain or zone file path from named.conf.local")
-    sys.exit(1)
 
-def list_zone_records(zone_file_path):
-    print(f"{'HOSTNAME':<15} {'IP ADDRESS':<18} {'COMMENT'}")
-    print("-" * 65)
-    regex_record = re.compile(r'^(\S+)\s+IN\s+A\s+(\S+)\s*(;.*)?$')
-    
-    if not os.path.isfile(zone_file_path):
-        print(f"Error: Zone file {zone_file_path} not found.")
+    zones = []
+    for match in RE_ZONE_STANZA.finditer(content):
+        body = zone_stanza_body(content, match.end())
+        type_match = re.search(r'\btype\s+(\w+)\s*;', body)
+        file_match = re.search(r'\bfile\s+"([^"]+)"', body)
+        if (type_match and type_match.group(1).lower() not in ("master", "primary")) or not file_match:
+            continue
+        zones.append((match.group(1).lower().rstrip('.'), re.sub(r'\.signed$', '', file_match.group(1))))
+
+    if not zones:
+        print("Error: Could not extract any zone and zone file path from named.conf.local")
         sys.exit(1)
+    return zones
 
-    count = 0
+def default_zone(zones):
+    """Relative host names go to the first forward zone."""
+    for domain, _ in zones:
+        if not domain.endswith(".arpa"):
+            return domain
+    return zones[0][0]
+
+def select_zones(zones, name):
+    if not name:
+        return zones
+    name = name.lower().rstrip('.')
+    selected = [zone for zone in zones if zone[0] == name]
+    if not selected:
+        print(f"Error: zone '{name}' not found in {NAMED_CONF_LOCAL}. "
+              f"Configured zones: {', '.join(domain for domain, _ in zones)}")
+        sys.exit(1)
+    return selected
+
+def route_record(record, domains, default):
+    """Finds the zone a record belongs to and makes its host relative to it. Raises ValueError.
+
+    Relative hosts go to `default`. Absolute names (trailing dot) and, for PTR
+    records, bare IP addresses go to the longest matching zone.
+    """
+    host = record['host']
+    if record['type'] == "PTR" and not host.endswith('.'):
+        try:
+            host = ipaddress.ip_address(host).reverse_pointer + "."
+        except ValueError:
+            pass
+    if not host.endswith('.'):
+        return default, record
+
+    fqdn = host.rstrip('.').lower()
+    for domain in sorted(domains, key=len, reverse=True):
+        if fqdn == domain:
+            return domain, dict(record, host="@")
+        if fqdn.endswith("." + domain):
+            return domain, dict(record, host=fqdn[:-len(domain) - 1])
+    raise ValueError(f"No managed zone for '{record['host']}'")
+
+def route_records(records, domains, default):
+    """Groups records by zone: {domain: [records]}, validated and merged per zone."""
+    routed = {}
+    for record in records:
+        try:
+            domain, record = route_record(record, domains, default)
+        except ValueError as e:
+            print(f"Error: {e}.")
+            sys.exit(1)
+        routed.setdefault(domain, []).append(record)
+    return {domain: merge_records(zone_records) for domain, zone_records in routed.items()}
+
+def next_origin(line, origin, domain=None):
+    """The origin after a zone file line: a new one for $ORIGIN, otherwise `origin` unchanged.
+
+    Origins are absolute and lowercase; None stands for the zone apex (no $ORIGIN yet,
+    or one naming the zone itself).
+    """
+    match = Zone.RE_ORIGIN.match(line)
+    if not match:
+        return origin
+    value = match.group(1).lower()
+    if not value.endswith('.'):
+        value = f"{value}.{origin or (domain.lower().rstrip('.') + '.' if domain else '')}"
+    if domain and value == domain.lower().rstrip('.') + '.':
+        return None
+    return value
+
+def apex_name(label, origin, domain=None):
+    """The owner name relative to the zone apex for a label written under `origin`.
+
+    Names outside the zone (or in a zone whose domain is unknown) stay fully qualified.
+    """
+    if origin is None:
+        return label
+    fqdn = label if label.endswith('.') else origin if label == '@' else f"{label}.{origin}"
+    if domain:
+        apex = domain.lower().rstrip('.') + '.'
+        if fqdn.lower() == apex:
+            return '@'
+        if fqdn.lower().endswith('.' + apex):
+            return fqdn[:-len(apex) - 1]
+    return fqdn
+
+class ZoneRecord:
+    """A single A/AAAA/CNAME/PTR line. Unmodified records keep their original text.
+
+    `name` is relative to the zone apex; `label` is the owner as written in the file,
+    which differs from it for records below an $ORIGIN.
+    """
+    __slots__ = ('name', 'rtype', 'value', 'comment', 'ttl', 'raw', 'label')
+
+    def __init__(self, name, rtype, value, comment='', ttl=None, raw=None, label=None):
+        self.name = name
+        self.rtype = rtype
+        self.value = value
+        self.comment = comment
+        self.ttl = ttl
+        self.raw = raw
+        self.label = label or name
+
+    def render(self):
+        if self.raw is not None:
+            return self.raw
+        ttl = f"{self.ttl} " if self.ttl else ""
+        comment = f" ; {self.comment}" if self.comment else ""
+        return f"{self.label:<8} {ttl}IN      {self.rtype:<7} {self.value:<15}{comment}\n"
+
+    @classmethod
+    def parse(cls, line, origin=None, domain=None):
+        """The record on a zone file line, or None for anything else."""
+        match = Zone.RE_RECORD.match(line)
+        if not match:
+            return None
+        label, ttl, rtype, value, comment = match.groups()
+        comment = comment.lstrip(';').strip() if comment else ''
+        return cls(apex_name(label, origin, domain), rtype, value, comment, ttl, raw=line, label=label)
+
+class Zone:
+    """In-memory zone file: raw lines plus records indexed by (name, type).
+
+    The serial line and the DNSSEC key $INCLUDEs are tracked as structured
+    fields so the whole file is parsed once and written once. New records go
+    before the first $ORIGIN that leaves the apex, so they land in the zone itself.
+    """
+    RE_RECORD = re.compile(r'^([^;\s]\S*)\s+(?:(\d+)\s+)?IN\s+(A|AAAA|CNAME|PTR)\s+(\S+)\s*(;.*)?$')
+    RE_SERIAL = re.compile(r'(\d+)(\s*;\s*Serial)', re.IGNORECASE)
+    RE_INCLUDE = re.compile(r'^\$INCLUDE\s+"?([^"\s]+)"?')
+    RE_ORIGIN = re.compile(r'^\$ORIGIN\s+(\S+)', re.IGNORECASE)
+
+    def __init__(self, path, domain=None):
+        self.path = path
+        self.domain = domain
+        self.origin = None
+        self._apex_end = None
+        self.entries = []
+        self.index = {}
+        self.types_by_name = {}
+        self.includes = []
+        self.serial = None
+        self._serial_entry = None
+
+    @classmethod
+    def load(cls, path, domain=None):
+        zone = cls(path, domain)
+        with open(path, 'r') as f:
+            for line in f:
+                zone._parse_line(line)
+        return zone
+
+    def _parse_line(self, line):
+        if '; Include DNSSEC keys' in line:
+            return
+        include = self.RE_INCLUDE.match(line)
+        if include and '.key' in line:
+            self.includes.append(include.group(1))
+            return
+
+        record = ZoneRecord.parse(line, self.origin, self.domain)
+        if record:
+            self.entries.append(record)
+            self.index.setdefault((record.name.lower(), record.rtype), []).append(record)
+            self.types_by_name.setdefault(record.name.lower(), set()).add(record.rtype)
+            return
+
+        if self._serial_entry is None:
+            serial = self.RE_SERIAL.search(line)
+            if serial:
+                self.serial = int(serial.group(1))
+                self._serial_entry = len(self.entries)
+        self.origin = next_origin(line, self.origin, self.domain)
+        if self.origin is not None and self._apex_end is None:
+            self._apex_end = len(self.entries)
+        self.entries.append(line)
+
+    def records(self, rtype=None):
+        for entry in self.entries:
+            if isinstance(entry, ZoneRecord) and (rtype is None or entry.rtype == rtype):
+                yield entry
+
+    def get(self, name, rtype):
+        found = self.index.get((name.lower(), rtype))
+        return found[0] if found else None
+
+    def check(self, name, rtype):
+        """Raises ValueError if a new (name, type) RRset would conflict with existing ones."""
+        if (name.lower(), rtype) in self.index:
+            return
+        other_types = self.types_by_name.get(name.lower(), set())
+        if (rtype == "CNAME" and other_types) or "CNAME" in other_types:
+            raise ValueError(f"'{name}' cannot have a CNAME together with other records")
+
+    def set(self, name, rtype, value, comment=''):
+        """Adds or replaces the (name, type) RRset. Returns 'created', 'updated' or 'unchanged'."""
+        existing = self.index.get((name.lower(), rtype))
+        if not existing:
+            self.check(name, rtype)
+            other_types = self.types_by_name.setdefault(name.lower(), set())
+            record = ZoneRecord(name, rtype, value, comment)
+            if self._apex_end is None:
+                self.entries.append(record)
+            else:
+                self.entries.insert(self._apex_end, record)
+                if self._serial_entry is not None and self._serial_entry >= self._apex_end:
+                    self._serial_entry += 1
+                self._apex_end += 1
+            self.index[(name.lower(), rtype)] = [record]
+            other_types.add(rtype)
+            return 'created'
+
+        record = existing[0]
+        # Duplicate lines for the same (name, type) collapse into the updated record.
+        for duplicate in existing[1:]:
+            self.entries.remove(duplicate)
+        del existing[1:]
+        if record.value == value and record.comment == comment:
+            return 'unchanged'
+        record.value, record.comment, record.raw = value, comment, None
+        return 'updated'
+
+    def bump_serial(self):
+        """Sets the serial to YYYYMMDDHH, or increments it when that would not move forward."""
+        if self._serial_entry is None:
+            return None, None
+        current_serial = self.serial
+        new_serial = int(datetime.utcnow().strftime('%Y%m%d%H'))
+        if new_serial <= current_serial:
+            new_serial = current_serial + 1
+        line = self.entries[self._serial_entry]
+        self.entries[self._serial_entry] = self.RE_SERIAL.sub(f'{new_serial}\\2', line, count=1)
+        self.serial = new_serial
+        return current_serial, new_serial
+
+    def render(self):
+        content = "".join(e.render() if isinstance(e, ZoneRecord) else e for e in self.entries).rstrip()
+        if self.includes:
+            content += "\n\n; Include DNSSEC keys\n"
+            content += "".join(f'$INCLUDE "{path}"\n' for path in self.includes)
+        else:
+            content += "\n"
+        return content
+
+# ================= ZONE LISTING =================
+# --list streams zone files line by line, so listing or exporting a large zone
+# never holds more than one record in memory. The daemon filters and pages its
+# cached Zone models with the same matcher.
+
+LIST_FORMATS = ("table", "json", "csv")
+LIST_FIELDS = ("zone", "host", "type", "value", "ttl", "comment")
+
+def iter_zone_records(zone_file_path, domain=None):
+    """Yields the zone's A/AAAA/CNAME/PTR records in file order, named relative to `domain`."""
+    origin = None
     with open(zone_file_path, 'r') as f:
         for line in f:
-            match = regex_record.match(line)
-            if match:
-                comm = match.group(3).replace(';', '').strip() if match.group(3) else ""
-                print(f"{match.group(1):<15} {match.group(2):<18} {comm}")
-                count += 1
+            record = ZoneRecord.parse(line, origin, domain)
+            if record:
+                yield record
+            else:
+                origin = next_origin(line, origin, domain)
+
+def reverse_pointer_address(fqdn):
+    """The address an in-addr.arpa/ip6.arpa name stands for, or None for partial names."""
+    labels = fqdn.lower().rstrip('.').split('.')
+    try:
+        if labels[-2:] == ["in-addr", "arpa"] and len(labels) == 6:
+            return ipaddress.ip_address(".".join(reversed(labels[:4])))
+        if labels[-2:] == ["ip6", "arpa"] and len(labels) == 34:
+            nibbles = "".join(reversed(labels[:32]))
+            return ipaddress.ip_address(":".join(nibbles[i:i + 4] for i in range(0, 32, 4)))
+    except ValueError:
+        pass
+    return None
+
+def record_address(record, domain=None):
+    """The IP address an A/AAAA record points to or a PTR record describes (None if unknown)."""
+    if record.rtype in ("A", "AAAA"):
+        try:
+            return ipaddress.ip_address(record.value)
+        except ValueError:
+            return None
+    if record.rtype == "PTR" and domain:
+        name = record.name
+        fqdn = domain if name == "@" else name if name.endswith('.') else f"{name}.{domain}"
+        return reverse_pointer_address(fqdn)
+    return None
+
+def record_matcher(host=None, address=None, rtype=None):
+    """Builds a matches(record, domain) filter. Raises ValueError for an invalid address.
+
+    host is a shell-style pattern ("web*"), address an IP or CIDR compared with
+    A/AAAA values and with the address of PTR owners.
+    """
+    network = ipaddress.ip_network(address, strict=False) if address else None
+    pattern = host.lower() if host else None
+
+    def matches(record, domain=None):
+        if rtype and record.rtype != rtype:
+            return False
+        if pattern and not fnmatch.fnmatchcase(record.name.lower(), pattern):
+            return False
+        if network:
+            ip = record_address(record, domain)
+            if ip is None or ip.version != network.version or ip not in network:
+                return False
+        return True
+    return matches
+
+def record_row(domain, record):
+    return {'zone': domain, 'host': record.name, 'type': record.rtype, 'value': record.value,
+            'ttl': int(record.ttl) if record.ttl else None, 'comment': record.comment}
+
+def check_zone_files(zones):
+    for _, zone_file_path in zones:
+        if not os.path.isfile(zone_file_path):
+            print(f"Error: Zone file {zone_file_path} not found.")
+            sys.exit(1)
+
+def list_zone_records(zone_file_path, domain=None, matches=None):
+    check_zone_files([(domain, zone_file_path)])
+
+    print(f"{'HOSTNAME':<15} {'TYPE':<6} {'VALUE':<28} {'COMMENT'}")
+    print("-" * 75)
+    count = 0
+    for record in iter_zone_records(zone_file_path, domain):
+        if matches and not matches(record, domain):
+            continue
+        print(f"{record.name:<15} {record.rtype:<6} {record.value:<28} {record.comment}")
+        count += 1
     if count == 0:
-        print("No 'A' records found.")
-    print("-" * 65)
+        print("No records found.")
+    print("-" * 75)
+
+def export_zone_records(zones, fmt, matches=None, out=None):
+    """Writes the records of every (domain, zone file) as one CSV or JSON document, as they are read."""
+    check_zone_files(zones)
+    out = out or sys.stdout
+    rows = (record_row(domain, record)
+            for domain, zone_file_path in zones
+            for record in iter_zone_records(zone_file_path, domain)
+            if not matches or matches(record, domain))
+
+    if fmt == "csv":
+        writer = csv.DictWriter(out, fieldnames=LIST_FIELDS, lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(rows)
+        return
+
+    out.write("[")
+    count = 0
+    for row in rows:
+        out.write(("," if count else "") + "\n  " + json.dumps(row))
+        count += 1
+    out.write("\n]\n" if count else "]\n")
+
+# ================= KEY & SIGNATURE METADATA =================
+
+KEY_TIMING_FIELDS = ("Created", "Publish", "Activate", "Revoke", "Inactive", "Delete")
+RE_KEY_TIMING = re.compile(r'^;?\s*(' + '|'.join(KEY_TIMING_FIELDS) + r'):\s*(\d{14})')
+RE_DNSKEY_FLAGS = re.compile(r'\sDNSKEY\s+(\d+)\s')
+RE_RRSIG = re.compile(r'(?:^|\s)RRSIG\s+[A-Z0-9]+\s+\d+\s+\d+\s+\d+')
+RE_SIG_TIMES = re.compile(r'\b(\d{14})\s+\d{14}\b')
+
+def parse_dnssec_time(value):
+    """Converts a YYYYMMDDHHMMSS (UTC) timestamp used by BIND into epoch seconds."""
+    return int(datetime.strptime(value, "%Y%m%d%H%M%S").replace(tzinfo=timezone.utc).timestamp())
+
+def format_timestamp(ts):
+    if ts is None:
+        return "-"
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%d %H:%M")
+
+def read_key_metadata(key_path):
+    """Reads role and timing metadata from a .key file and its .private (no BIND tools)."""
+    name = os.path.basename(key_path)[:-len(".key")]
+    meta = {'name': name, 'tag': int(name.rsplit('+', 1)[-1]), 'role': None}
+    for field in KEY_TIMING_FIELDS:
+        meta[field.lower()] = None
+
+    # The .key comments mirror the .private fields; the .private one wins
+    # because dnssec-settime always rewrites it.
+    private_path = key_path[:-len(".key")] + ".private"
+    for path in (key_path, private_path):
+        try:
+            with open(path, 'r') as f:
+                for line in f:
+                    match = RE_KEY_TIMING.match(line)
+                    if match:
+                        meta[match.group(1).lower()] = parse_dnssec_time(match.group(2))
+                        continue
+                    match = RE_DNSKEY_FLAGS.search(line)
+                    if match:
+                        meta['role'] = "KSK" if int(match.group(1)) & 1 else "ZSK"
+        except (OSError, ValueError):
+            continue
+    return meta
+
+def list_domain_keys(domain):
+    keys = [read_key_metadata(path) for path in glob.glob(os.path.join(KEYS_DIR, f"K{domain}.*.key"))]
+    return sorted(keys, key=lambda key: (key['created'] or 0, key['tag']))
+
+def key_state(key, now):
+    if key['delete'] is not None and key['delete'] <= now:
+        return "deleted"
+    if key['inactive'] is not None and key['inactive'] <= now:
+        return "inactive"
+    if key['activate'] is None or key['activate'] <= now:
+        return "active"
+    if key['publish'] is None or key['publish'] <= now:
+        return "published"
+    return "created"
+
+def scan_signature_expiry(signed_file):
+    """Earliest RRSIG expiration in a signed zone file, read in a single streaming pass."""
+    earliest = None
+    pending = False
+    with open(signed_file, 'r', errors='replace') as f:
+        for line in f:
+            if not pending:
+                if "RRSIG" not in line or not RE_RRSIG.search(line):
+                    continue
+            # dnssec-signzone splits RRSIG rdata over lines: the times may follow on the next one.
+            match = RE_SIG_TIMES.search(line)
+            if not match:
+                pending = True
+                continue
+            pending = False
+            expires = parse_dnssec_time(match.group(1))
+            if earliest is None or expires < earliest:
+                earliest = expires
+    return earliest
+
+def signature_expiry(zone_file_path, state):
+    """Returns the signatures' expiry, rescanning the signed zone only if it changed since last recorded."""
+    signed_file = zone_file_path + ".signed"
+    try:
+        mtime = os.stat(signed_file).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    if state.get('signed_mtime') != mtime or 'sig_expires' not in state:
+        state['sig_expires'] = scan_signature_expiry(signed_file)
+        state['signed_mtime'] = mtime
+    return state['sig_expires']
+
+def check_keys_need_rotation(domain, zone_file_path, state):
+    """Check if keys exist and if DNSSEC signatures are expired, from key metadata and cached state."""
+    now = time.time()
+    keys = list_domain_keys(domain)
 
-def check_keys_need_rotation(domain):
-    """Check if keys exist and if DNSSEC signatures are expired."""
-    existing_keys = glob.glob(os.path.join(KEYS_DIR, f"K{domain}.*.key"))
-    
     # No keys? Need generation
-    if len(existing_keys) < 2:
+    if len(keys) < 2:
         return True, "Keys missing"
-    
-    # Check if signatures are expired by looking at the signed zone file
-    domain, zone_file_path = extract_zone_info()
-    signed_file = zone_file_path + ".signed"
-    
-    if not os.path.exists(signed_file):
+
+    active_roles = {key['role'] for key in keys if key_state(key, now) == "active"}
+    if not {"ZSK", "KSK"} <= active_roles:
+        return True, "No active ZSK/KSK pair"
+
+    # Inline-signed zones have their signatures refreshed by named itself.
+    if state.get('signing_mode', 'offline') == 'inline':
+        return False, "Keys are valid"
+
+    expires = signature_expiry(zone_file_path, state)
+    if expires is None:
         return True, "Signed zone file missing"
-    
-    # Check for expired signatures in logs or file
-    try:
-        result = subprocess.run(
-            ["named-checkzone", domain, signed_file],
-            capture_output=True,
-            text=True
-        )
-        if "expired" in result.stderr.lower() or "expired" in result.stdout.lower():
-            return True, "DNSSEC signatures expired"
-    except:
-        pass
-    
+    if expires <= now:
+        return True, "DNSSEC signatures expired"
+
     return False, "Keys are valid"
 
-def ensure_dnssec_keys(domain, force_rotation=False):
-    """Ensure DNSSEC keys exist and are valid. Rotate if needed or forced."""
+def show_status(domain, zone_file_path, state):
+    """Prints signing mode, NSEC3 salt, key timings and signature expiry without calling BIND tools."""
+    now = time.time()
+    signing_mode = state.get('signing_mode', 'offline')
+    needs_rotation, reason = check_keys_need_rotation(domain, zone_file_path, state)
+
+    print(f"Zone:             {domain}")
+    print(f"Zone file:        {zone_file_path}")
+    print(f"Signing mode:     {signing_mode}")
+    print(f"NSEC3 salt:       {state.get('nsec3_salt') or '-'}")
+    print(f"Last signed:      {format_timestamp(state.get('signed_at'))}")
+    if signing_mode == 'inline':
+        print("Signatures:       maintained by named (inline-signing)")
+    else:
+        expires = state.get('sig_expires')
+        if expires is None:
+            print("Signatures:       no signed zone")
+        else:
+            days = (expires - now) / 86400
+            print(f"Signatures:       expire {format_timestamp(expires)} ({days:.1f} days)")
+    print(f"Rotation needed:  {'yes' if needs_rotation else 'no'} ({reason})")
+    print()
+
+    print(f"{'ROLE':<5} {'TAG':<6} {'STATE':<10} {'CREATED':<17} {'ACTIVATE':<17} {'INACTIVE':<17} {'DELETE'}")
+    print("-" * 90)
+    keys = list_domain_keys(domain)
+    for key in keys:
+        print(f"{key['role'] or '?':<5} {key['tag']:<6} {key_state(key, now):<10} "
+              f"{format_timestamp(key['created']):<17} {format_timestamp(key['activate']):<17} "
+              f"{format_timestamp(key['inactive']):<17} {format_timestamp(key['delete'])}")
+    if not keys:
+        print("No keys found.")
+    print("-" * 90)
+
+# ================= KEY ROLLOVER =================
+# Keys are never removed while resolvers may still hold them. Each role rolls
+# over through timing metadata that dnssec-signzone -S and named both honour:
+#   ZSK (pre-publish):      new key published -> activated after the TTL wait,
+#                           old key retired then -> deleted after another wait.
+#   KSK (double-signature): new key published and signing next to the old one,
+#                           old key removed once the DS/trust anchor moved over.
+
+RE_TTL_DIRECTIVE = re.compile(r'^\$TTL\s+(\d+)')
+RE_RECORD_TTL = re.compile(r'^\S*\s+(\d+)\s+IN\s', re.IGNORECASE)
+
+def format_dnssec_time(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y%m%d%H%M%S")
+
+def zone_max_ttl(zone_file_path):
+    """Largest TTL in the unsigned zone: how long resolvers may cache old keys or signatures."""
+    max_ttl = 0
+    with open(zone_file_path, 'r') as f:
+        for line in f:
+            match = RE_TTL_DIRECTIVE.match(line) or RE_RECORD_TTL.match(line)
+            if match:
+                max_ttl = max(max_ttl, int(match.group(1)))
+    return max_ttl or 86400
+
+def fix_key_permissions(name):
+    bind_uid, bind_gid = get_bind_uid_gid()
+    for ext, mode in ((".key", 0o644), (".private", 0o600)):
+        path = os.path.join(KEYS_DIR, name + ext)
+        if os.path.exists(path):
+            os.chown(path, bind_uid, bind_gid)
+            os.chmod(path, mode)
+
+def generate_key(domain, role, publish, activate):
+    """Creates a key with its publish/activate times set. Returns the key name."""
+    command = ["dnssec-keygen", "-a", "ECDSAP256SHA256", "-n", "ZONE", "-K", KEYS_DIR,
+               "-P", format_dnssec_time(publish), "-A", format_dnssec_time(activate)]
+    if role == "KSK":
+        command += ["-f", "KSK"]
+    result = subprocess.run(command + [domain], cwd=KEYS_DIR, capture_output=True, text=True)
+    name = result.stdout.strip().splitlines()[-1] if result.stdout.strip() else ""
+    if result.returncode != 0 or not os.path.exists(os.path.join(KEYS_DIR, name + ".key")):
+        print(f"Error: DNSSEC {role} generation failed. {result.stderr.strip()}")
+        sys.exit(1)
+    fix_key_permissions(name)
+    print(f"   New {role} {name}: publish {format_timestamp(publish)}, activate {format_timestamp(activate)}")
+    return name
+
+def retire_key(key, inactive, delete):
+    """Schedules when an old key stops signing and when it leaves the DNSKEY RRset."""
+    result = subprocess.run(["dnssec-settime", "-K", KEYS_DIR,
+                             "-I", format_dnssec_time(inactive), "-D", format_dnssec_time(delete),
+                             key['name']], capture_output=True, text=True)
+    if result.returncode != 0:
+        print(f"Error: could not schedule retirement of {key['name']}. {result.stderr.strip()}")
+        sys.exit(1)
+    fix_key_permissions(key['name'])
+    print(f"   Retiring {key['role']} {key['name']}: inactive {format_timestamp(inactive)}, "
+          f"delete {format_timestamp(delete)}")
+
+def start_rollover(domain, zone_file_path, role, current, now):
+    wait = zone_max_ttl(zone_file_path) + PROPAGATION_DELAY
+    if role == "ZSK":
+        activate = now + wait
+        generate_key(domain, "ZSK", publish=now, activate=activate)
+        if current:
+            retire_key(current, inactive=activate, delete=activate + wait)
+    else:
+        new_key = generate_key(domain, "KSK", publish=now, activate=now)
+        if current:
+            retire = now + wait + KSK_DS_WAIT
+            retire_key(current, inactive=retire, delete=retire)
+            print(f"   Notice: publish the DS of {new_key} at the parent zone (dnssec-dsfromkey) "
+                  f"before {format_timestamp(retire)}.")
+
+def advance_rollover(domain, zone_file_path, force_roles=(), now=None):
+    """One step of the rollover schedule. Returns True if the key set changed."""
+    now = now or time.time()
+    changed = False
+
+    for key in list_domain_keys(domain):
+        if key_state(key, now) == "deleted":
+            print(f"   Removing {key['role']} {key['name']} (past its delete time)")
+            for ext in (".key", ".private"):
+                path = os.path.join(KEYS_DIR, key['name'] + ext)
+                if os.path.exists(path):
+                    os.remove(path)
+            changed = True
+
+    keys = list_domain_keys(domain)
+    for role, lifetime in (("ZSK", ZSK_LIFETIME), ("KSK", KSK_LIFETIME)):
+        role_keys = [key for key in keys if key['role'] == role]
+        # The key currently in service with no successor scheduled yet.
+        current = [key for key in role_keys if key_state(key, now) == "active" and key['inactive'] is None]
+        pending = [key for key in role_keys if key_state(key, now) in ("created", "published")]
+
+        if not current and not pending:
+            if any(key_state(key, now) == "active" for key in role_keys):
+                continue
+            # Nothing can be cached for a role that never had a key.
+            print(f"Notice: No active {role} for {domain}, generating one.")
+            generate_key(domain, role, publish=now, activate=now)
+            changed = True
+            continue
+
+        if not current or pending:
+            continue
+        current = max(current, key=lambda key: key['activate'] or key['created'] or 0)
+        started = current['activate'] or current['created'] or now
+        if role in force_roles or now - started >= lifetime:
+            print(f"Notice: Starting {role} rollover for {domain}"
+                  f"{' (manual)' if role in force_roles else ''}.")
+            start_rollover(domain, zone_file_path, role, current, now)
+            changed = True
+
+    return changed
+
+def key_events_since(keys, since, now):
+    """True if a publish/activate/inactive/delete time fell between the last signing and now."""
+    for key in keys:
+        for field in ('publish', 'activate', 'inactive', 'delete'):
+            if key[field] is not None and since < key[field] <= now:
+                return True
+    return False
+
+def signatures_need_refresh(zone_file_path, state):
+    """Offline-signed zones are re-signed well before their RRSIGs expire."""
+    if state.get('signing_mode', 'offline') == 'inline':
+        return False
+    expires = signature_expiry(zone_file_path, state)
+    return expires is None or expires - time.time() < SIG_REFRESH
+
+@timed("key_check")
+def ensure_dnssec_keys(domain, zone_file_path, state, force_rotation=False):
+    """Ensure DNSSEC keys exist and advance any rollover.
+
+    Returns the key files to $INCLUDE and whether the key set changed since the last signing.
+    """
     bind_uid, bind_gid = get_bind_uid_gid()
     
     if not os.path.exists(KEYS_DIR):
@@ -247,136 +1301,163 @@ def ensure_dnssec_keys(domain, force_rotation=False):
         os.chown(KEYS_DIR, bind_uid, bind_gid)
         os.chmod(KEYS_DIR, 0o750)
     
-    needs_rotation, reason = check_keys_need_rotation(domain)
-    
-    if force_rotation:
-        print("Notice: FORCED key rotation requested...")
-        reason = "Manual rotation"
-        needs_rotation = True
-    elif needs_rotation:
-        print(f"Notice: Key rotation needed: {reason}")
-    
+    needs_rotation, reason = check_keys_need_rotation(domain, zone_file_path, state)
     if needs_rotation:
-        # Remove old keys
-        print("   Removing old keys...")
-        for f in glob.glob(os.path.join(KEYS_DIR, f"K{domain}.*")):
-            os.remove(f)
-        
-        # Generate new keys
-        print("   Generating new DNSSEC key pair...")
-        os.chdir(KEYS_DIR)
-        subprocess.run(["dnssec-keygen", "-a", "ECDSAP256SHA256", "-n", "ZONE", domain], 
-                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        subprocess.run(["dnssec-keygen", "-a", "ECDSAP256SHA256", "-n", "ZONE", "-f", "KSK", domain], 
-                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        
-        # Fix permissions
-        for f in os.listdir(KEYS_DIR):
-            os.chown(os.path.join(KEYS_DIR, f), bind_uid, bind_gid)
-            if f.endswith(".private"): 
-                os.chmod(os.path.join(KEYS_DIR, f), 0o600)
-            else: 
-                os.chmod(os.path.join(KEYS_DIR, f), 0o644)
-        
-        print("   Success: New keys generated.")
-    
-    # Get key files
-    key_files = sorted(glob.glob(os.path.join(KEYS_DIR, f"K{domain}.*.key")), key=os.path.getmtime)
-    if not key_files:
+        print(f"Notice: {reason}")
+
+    if force_rotation:
+        print("Notice: Manual key rollover requested (old keys stay published until their TTLs expire)...")
+    changed = advance_rollover(domain, zone_file_path, force_roles=("ZSK", "KSK") if force_rotation else ())
+
+    now = time.time()
+    keys = list_domain_keys(domain)
+    roles = {key['role'] for key in keys if key_state(key, now) == "active"}
+    if not {"ZSK", "KSK"} <= roles:
         print("Error: DNSSEC keys generation failed.")
         sys.exit(1)
-    
-    return os.path.basename(key_files[0]), os.path.basename(key_files[-1])
 
-def update_zone_file(zone_file_path, user_records, zsk_key, ksk_key):
-    """Update zone file with new records and DNSSEC keys."""
+    key_files = [os.path.join(KEYS_DIR, key['name'] + ".key")
+                 for key in keys if key_state(key, now) in ("published", "active", "inactive")]
+    return key_files, changed or key_events_since(keys, state.get('signed_at', 0), now)
+
+@timed("zone_rewrite")
+def update_zone_file(zone_file_path, user_records, key_files, domain=None):
+    """Update zone file with new records and the published DNSSEC keys.
+
+    Returns False, without touching the file or the serial, when nothing changed.
+    """
     bind_uid, bind_gid = get_bind_uid_gid()
     
     if not os.path.isfile(zone_file_path):
         print(f"Error: Zone file {zone_file_path} not found.")
         sys.exit(1)
 
-    with open(zone_file_path, 'r') as f:
-        lines = f.readlines()
-
-    updated_lines = []
-    processed_hosts = set()
-    regex_rec = re.compile(r'^(\S+)\s+IN\s+A\s+(\S+)\s*(;.*)?$')
+    zone = Zone.load(zone_file_path, domain)
+    before = zone.render()
 
-    # Update existing records or keep them
-    for line in lines:
-        match = regex_rec.match(line)
-        if match:
-            current_host = match.group(1)
-            update_data = next((r for r in user_records if r['host'] == current_host), None)
-            if update_data:
-                print(f"  [UPDATING] {current_host}: {update_data['ip']}")
-                new_line = f"{current_host:<8} IN      A       {update_data['ip']:<15} ; {update_data['comment']}\n"
-                updated_lines.append(new_line)
-                processed_hosts.add(current_host)
-            else:
-                updated_lines.append(line)
-        else:
-            updated_lines.append(line)
-
-    # Add new records
     for record in user_records:
-        if record['host'] not in processed_hosts:
-            print(f"  [CREATING] {record['host']}: {record['ip']}")
-            new_line = f"{record['host']:<8} IN      A       {record['ip']:<15} ; {record['comment']}\n"
-            inserted = False
-            for i, line in enumerate(updated_lines):
-                if '$INCLUDE' in line or '; Include DNSSEC keys' in line:
-                    updated_lines.insert(i, new_line)
-                    inserted = True
-                    break
-            if not inserted:
-                updated_lines.append(new_line)
-
-    # Update serial and prepare final content
-    final_lines = []
-    serial_updated = False
-    date_serial = int(datetime.utcnow().strftime('%Y%m%d%H'))
-
-    for line in updated_lines:
-        if '$INCLUDE' in line and '.key' in line: continue
-        if '; Include DNSSEC keys' in line: continue
-        
-        serial_match = re.search(r'(\d+)\s*;\s*Serial', line, re.IGNORECASE)
-        if serial_match and not serial_updated:
-            current_serial = int(serial_match.group(1))
-            new_serial = date_serial
-            if new_serial <= current_serial:
-                new_serial = current_serial + 1
-            line = re.sub(r'\d+(\s*;\s*Serial)', f'{new_serial}\\1', line, count=1)
-            serial_updated = True
-            print(f"   Serial updated: {current_serial} -> {new_serial}")
-        
-        final_lines.append(line)
+        try:
+            status = zone.set(record['host'], record['type'], record['value'], record['comment'])
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        if status == 'created':
+            print(f"  [CREATING] {record['host']} {record['type']}: {record['value']}")
+        elif status == 'updated':
+            print(f"  [UPDATING] {record['host']} {record['type']}: {record['value']}")
 
-    # Add DNSSEC keys
-    content = "".join(final_lines).rstrip()
-    content += "\n\n; Include DNSSEC keys\n"
-    content += f'$INCLUDE "{os.path.join(KEYS_DIR, zsk_key)}"\n'
-    content += f'$INCLUDE "{os.path.join(KEYS_DIR, ksk_key)}"\n'
+    zone.includes = key_files
+    if zone.render() == before:
+        return False
+
+    current_serial, new_serial = zone.bump_serial()
+    if new_serial is not None:
+        print(f"   Serial updated: {current_serial} -> {new_serial}")
 
     # Write updated zone file
-    with open(zone_file_path, 'w') as f:
-        f.write(content)
-    
-    os.chown(zone_file_path, bind_uid, bind_gid)
-    os.chmod(zone_file_path, 0o644)
+    atomic_write(zone_file_path, zone.render(), 0o644, (bind_uid, bind_gid))
+    return True
+
+# ================= SIGNING STATE =================
+
+def state_file(domain):
+    return os.path.join(STATE_DIR, f"{domain}.json")
 
-def sign_zone(domain, zone_file_path):
-    """Sign the zone with DNSSEC."""
+def load_state(domain):
+    """Per-zone handler state (signing mode, NSEC3 salt, last signing)."""
+    try:
+        with open(state_file(domain), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_state(domain, state):
+    os.makedirs(STATE_DIR, mode=0o700, exist_ok=True)
+    atomic_write(state_file(domain), json.dumps(state, indent=2, sort_keys=True), 0o600)
+
+def read_signed_salt(zone_file_path):
+    """Reads the NSEC3 salt from the apex NSEC3PARAM of an existing signed zone."""
+    signed_file = zone_file_path + ".signed"
+    if not os.path.isfile(signed_file):
+        return None
+    with open(signed_file, 'r') as f:
+        for count, line in enumerate(f):
+            match = re.search(r'\sNSEC3PARAM\s+\d+\s+\d+\s+\d+\s+([0-9A-Fa-f]+|-)', line)
+            if match:
+                return None if match.group(1) == '-' else match.group(1).upper()
+            if count > 500:
+                break
+    return None
+
+def get_nsec3_salt(domain, zone_file_path, state, rotate=False):
+    """Keeps the NSEC3 salt stable so re-signing does not rebuild the whole NSEC3 chain."""
+    salt = None if rotate else (state.get('nsec3_salt') or read_signed_salt(zone_file_path))
+    if not salt:
+        salt = secrets.token_hex(4).upper()
+        print(f"   New NSEC3 salt: {salt}")
+    state['nsec3_salt'] = salt
+    return salt
+
+def configure_signing_mode(domain, mode, state):
+    """Switches the zone stanza in named.conf.local between offline and inline signing."""
+    # Zones are processed in parallel but share named.conf.local.
+    with file_lock("named.conf.local"):
+        _configure_signing_mode(domain, mode, state)
+
+def _configure_signing_mode(domain, mode, state):
+    with open(NAMED_CONF_LOCAL, 'r') as f:
+        content = f.read()
+
+    stanza_re = re.compile(r'(zone\s+"' + re.escape(domain) + r'"\s*(?:IN\s*)?\{)(.*?)(\n\};)', re.DOTALL | re.IGNORECASE)
+    match = stanza_re.search(content)
+    if not match:
+        print(f"Error: zone \"{domain}\" stanza not found in {NAMED_CONF_LOCAL}.")
+        sys.exit(1)
+
+    body = match.group(2)
+    body = re.sub(r'\n\s*(inline-signing|auto-dnssec|key-directory)\s[^;]*;', '', body)
+    if mode == 'inline':
+        # named loads the unsigned file and keeps its own signed copy up to date.
+        body = re.sub(r'(file\s+")([^"]+?)(?:\.signed)?(")', r'\1\2\3', body)
+        body += f'\n    inline-signing yes;\n    auto-dnssec maintain;\n    key-directory "{KEYS_DIR}";'
+    else:
+        body = re.sub(r'(file\s+")([^"]+?)(?:\.signed)?(")', r'\1\2.signed\3', body)
+    new_content = content[:match.start(2)] + body + content[match.end(2):]
+
+    mode_bits = os.stat(NAMED_CONF_LOCAL).st_mode & 0o777
+    if new_content != content:
+        atomic_write(NAMED_CONF_LOCAL + ".bak", content, mode_bits)
+        atomic_write(NAMED_CONF_LOCAL, new_content, mode_bits)
+
+        with timed("checkconf"):
+            check = subprocess.run(["named-checkconf"], capture_output=True)
+        if check.returncode != 0:
+            print("CRITICAL ERROR: The new configuration is invalid.")
+            print(check.stderr.decode())
+            print("Restoring backup...")
+            atomic_write(NAMED_CONF_LOCAL, content, mode_bits)
+            sys.exit(1)
+
+    state['signing_mode'] = mode
+    print(f"Signing mode for {domain} set to: {mode}")
+
+def enable_inline_nsec3(domain, salt):
+    """Asks named to build the NSEC3 chain for an inline-signed zone with our salt."""
+    subprocess.run(["rndc", "signing", "-nsec3param", "1", "0", "0", salt, domain],
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+@timed("sign")
+def sign_zone(domain, zone_file_path, salt, state):
+    """Sign the zone with DNSSEC and record when its signatures expire."""
     bind_uid, bind_gid = get_bind_uid_gid()
     
     print("Signing zone with DNSSEC...")
-    salt = secrets.token_hex(4).upper()
+    signed_at = int(time.time())
     try:
         subprocess.run([
             "dnssec-signzone", "-A", "-3", salt, 
-            "-N", "INCREMENT", "-o", domain, 
+            "-N", "INCREMENT", "-o", domain, "-S",
+            "-e", f"now+{SIG_VALIDITY}",
             "-K", KEYS_DIR, zone_file_path
         ], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
         print("   Success: Zone signed.")
@@ -388,12 +1469,474 @@ def sign_zone(domain, zone_file_path):
     if os.path.exists(signed_file):
         os.chown(signed_file, bind_uid, bind_gid)
         os.chmod(signed_file, 0o644)
+        # Later runs trust these values while the signed file's mtime is unchanged.
+        state['signed_at'] = signed_at
+        state['sig_expires'] = signed_at + SIG_VALIDITY
+        state['signed_mtime'] = os.stat(signed_file).st_mtime_ns
+
+@timed("zone_total")
+def manage_zone(domain, zone_file_path, user_records=(), rotate_keys=False,
+                signing_mode=None, rotate_salt=False, restart=True):
+    """Applies record, key and signing changes to the zone, then signs and reloads it once.
+
+    Returns True when named still has to be restarted (signing mode changed and restart=False).
+    """
+    print(f"Managing zone: {domain}")
+
+    state = load_state(domain)
+    mode_changed = bool(signing_mode) and signing_mode != state.get('signing_mode', 'offline')
+    if mode_changed:
+        configure_signing_mode(domain, signing_mode, state)
+    signing_mode = state.get('signing_mode', 'offline')
+
+    # Ensure DNSSEC keys exist and advance any scheduled rollover
+    key_files, keys_changed = ensure_dnssec_keys(domain, zone_file_path, state, force_rotation=rotate_keys)
+
+    # Update zone file with records and keys
+    zone_changed = False
+    if user_records or keys_changed:
+        zone_changed = update_zone_file(zone_file_path, user_records, key_files, domain)
+
+    # Re-applying identical state costs nothing: no signing, no reload.
+    if not (zone_changed or keys_changed or mode_changed or rotate_salt or rotate_keys
+            or signatures_need_refresh(zone_file_path, state)):
+        save_state(domain, state)
+        print("   No changes: zone left as is.")
+        return False
+    
+    salt = get_nsec3_salt(domain, zone_file_path, state, rotate=rotate_salt)
+
+    if signing_mode == 'offline':
+        # Always sign the zone when making changes
+        sign_zone(domain, zone_file_path, salt, state)
+
+    if mode_changed:
+        # The zone's file and options changed: named must re-read its configuration.
+        if restart:
+            restart_service()
+    else:
+        # Make the new zone live without restarting BIND9
+        reload_zone(domain, load_keys=signing_mode == 'inline' and keys_changed)
+
+    if signing_mode == 'inline' and (mode_changed or rotate_salt):
+        enable_inline_nsec3(domain, salt)
+
+    save_state(domain, state)
+    return mode_changed and not restart
+
+def zone_worker(domain, zone_file_path, records, options):
+    """Process pool entry point: one zone, under its lock, with its output captured.
+
+    Returns (ok, output, needs_restart, timings); the parent merges the timings.
+    """
+    needs_restart = []
+    def run():
+        with file_lock(domain):
+            needs_restart.append(manage_zone(domain, zone_file_path, records, restart=False, **options))
+    ok, output = run_captured(run)
+    # Pool workers run one job at a time on a single thread: hand over this job's timings.
+    timings = dict(TIMED_PHASES)
+    TIMED_PHASES.clear()
+    return ok, output, bool(needs_restart and needs_restart[0]), timings
+
+def manage_zones(jobs, **options):
+    """Applies changes to each (domain, zone_file_path, records) job.
+
+    Independent zones are updated, signed and validated in parallel processes;
+    named is restarted at most once afterwards.
+    """
+    if len(jobs) == 1:
+        domain, zone_file_path, records = jobs[0]
+        with file_lock(domain):
+            results = [(True, "", manage_zone(domain, zone_file_path, records, restart=False, **options))]
+    else:
+        workers = min(len(jobs), os.cpu_count() or 1)
+        # Spawned, not forked: the daemon calls this from a worker thread while request
+        # threads may hold locks, and a forked child would inherit them locked.
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = [pool.submit(zone_worker, domain, zone_file_path, records, options)
+                       for domain, zone_file_path, records in jobs]
+            results = []
+            for future in futures:
+                ok, output, needs_restart, timings = future.result()
+                merge_timings(timings)
+                results.append((ok, output, needs_restart))
+        for _, output, _ in results:
+            sys.stdout.write(output)
+
+    if any(needs_restart for _, _, needs_restart in results):
+        restart_service()
+
+    failed = [job[0] for job, (ok, _, _) in zip(jobs, results) if not ok]
+    if failed:
+        print(f"Error: changes failed for zone(s): {', '.join(failed)}")
+        sys.exit(1)
+
+# ================= DAEMON MODE =================
+# A long-running handler that keeps the zone, forwarders and keys in memory,
+# notices external edits by file mtime, and serves a small JSON API on a Unix
+# socket. Record changes that arrive close together are applied as a single
+# update + sign + reload.
+
+class Job:
+    """One queued API operation; the requester waits on `done`."""
+
+    def __init__(self, kind, payload):
+        self.kind = kind
+        self.payload = payload
+        self.done = threading.Event()
+        self.ok = None
+        self.output = ""
+
+class ThreadOutput(io.TextIOBase):
+    """Stands in for sys.stdout and sends each thread's writes to the stream bound to it.
+
+    Jobs print through the stream they were given; other threads (request handlers,
+    refreshes) keep writing to the real stdout while a job runs.
+    """
+    _install_lock = threading.Lock()
+
+    def __init__(self, default):
+        self.default = default
+        self.local = threading.local()
+
+    @classmethod
+    def install(cls):
+        with cls._install_lock:
+            if not isinstance(sys.stdout, cls):
+                sys.stdout = cls(sys.stdout)
+        return sys.stdout
+
+    @contextlib.contextmanager
+    def bound(self, stream):
+        previous = getattr(self.local, 'stream', None)
+        self.local.stream = stream
+        try:
+            yield stream
+        finally:
+            self.local.stream = previous
+
+    def current(self):
+        return getattr(self.local, 'stream', None) or self.default
+
+    def write(self, text):
+        return self.current().write(text)
+
+    def flush(self):
+        self.current().flush()
+
+def run_captured(func, *args, **kwargs):
+    """Runs a CLI-style function (print + sys.exit) and returns (ok, printed output).
+
+    Only the calling thread's output is captured, into a buffer of its own.
+    """
+    buffer = io.StringIO()
+    ok = True
+    try:
+        with ThreadOutput.install().bound(buffer):
+            func(*args, **kwargs)
+    except SystemExit as e:
+        ok = not e.code
+    except Exception as e:
+        buffer.write(f"Error: {e}\n")
+        ok = False
+    return ok, buffer.getvalue()
+
+class ZoneDaemon:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.queue = threading.Condition()
+        self.jobs = []
+        self.mtimes = {}
+        self.zones = []        # [(domain, zone file)] in named.conf.local order
+        self.models = {}       # domain -> Zone
+        self.keys = {}         # domain -> key metadata
+        self.forwarders = None
+        self.last_apply = None
+        self.refresh()
+
+    def _changed(self, path):
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if self.mtimes.get(path) == mtime:
+            return False
+        self.mtimes[path] = mtime
+        return True
+
+    def refresh(self):
+        """Re-reads only the files that changed on disk since the last look."""
+        with self.lock:
+            zones_changed = self._changed(NAMED_CONF_LOCAL)
+            if zones_changed:
+                self.zones = extract_zones()
+                self.models = {domain: self.models[domain] for domain, _ in self.zones if domain in self.models}
+                for _, zone_file_path in self.zones:
+                    self.mtimes.pop(zone_file_path, None)
+            for domain, zone_file_path in self.zones:
+                if self._changed(zone_file_path):
+                    self.models[domain] = Zone.load(zone_file_path, domain)
+            if self._changed(NAMED_CONF_OPTIONS):
+                self.forwarders = read_forwarders()
+            if self._changed(KEYS_DIR) or zones_changed:
+                self.keys = {domain: list_domain_keys(domain) for domain, _ in self.zones}
+
+    def route(self, records):
+        """{domain: [records]} for a list of records. Raises ValueError."""
+        with self.lock:
+            domains = [domain for domain, _ in self.zones]
+            default = default_zone(self.zones)
+        routed = {}
+        for record in records:
+            domain, record = route_record(record, domains, default)
+            routed.setdefault(domain, []).append(record)
+        return routed
+
+    def submit(self, kind, payload):
+        job = Job(kind, payload)
+        with self.queue:
+            self.jobs.append(job)
+            self.queue.notify()
+        return job
+
+    def validate_records(self, records):
+        """Checks records against the in-memory zones before queueing. Returns an error or None."""
+        try:
+            routed = self.route(records)
+        except ValueError as e:
+            return str(e)
+        with self.lock:
+            for domain, zone_records in routed.items():
+                for record in zone_records:
+                    error = validate_record(record)
+                    if error:
+                        return f"{record['host']} {record['type']}: {error}"
+                    try:
+                        self.models[domain].check(record['host'], record['type'])
+                    except ValueError as e:
+                        return str(e)
+        return None
+
+    def status(self):
+        now = time.time()
+        with self.lock:
+            zones = []
+            for domain, zone_file_path in self.zones:
+                state = load_state(domain)
+                zone = self.models[domain]
+                zones.append({
+                    'domain': domain,
+                    'zone_file': zone_file_path,
+                    'serial': zone.serial,
+                    'records': len(zone.index),
+                    'signing_mode': state.get('signing_mode', 'offline'),
+                    'signed_at': state.get('signed_at'),
+                    'sig_expires': state.get('sig_expires'),
+                    'keys': [dict(key, state=key_state(key, now)) for key in self.keys.get(domain, [])],
+                })
+            return {
+                'zones': zones,
+                'forwarders': self.forwarders,
+                'pending': len(self.jobs),
+                'last_apply': self.last_apply,
+            }
+
+    def records(self, domain=None, matches=None, offset=0, limit=RECORDS_PAGE_SIZE):
+        """One page of a zone's records (default: the first forward zone) and the number matching.
+
+        Raises KeyError for unknown zones.
+        """
+        # Zone files edited since the last look are re-parsed; the others are served from memory.
+        try:
+            self.refresh()
+        except (SystemExit, OSError):
+            pass
+        with self.lock:
+            domain = (domain or default_zone(self.zones)).lower().rstrip('.')
+            page, total = [], 0
+            for record in self.models[domain].records():
+                if matches and not matches(record, domain):
+                    continue
+                if offset <= total < offset + limit:
+                    page.append(record_row(domain, record))
+                total += 1
+            return domain, total, page
+
+    def _apply(self, jobs):
+        record_jobs = [job for job in jobs if job.kind == 'records']
+        if record_jobs:
+            records = [record for job in record_jobs for record in job.payload]
+            with self.lock:
+                zones = dict(self.zones)
+            def apply():
+                routed = self.route(records)
+                manage_zones([(domain, zones[domain], merge_records(zone_records))
+                              for domain, zone_records in routed.items()])
+            ok, output = run_captured(apply)
+            self.last_apply = {'at': int(time.time()), 'jobs': len(record_jobs),
+                               'records': len(records), 'ok': ok}
+            for job in record_jobs:
+                job.ok, job.output = ok, output
+                job.done.set()
+
+        for job in jobs:
+            if job.kind == 'forwarders':
+                job.ok, job.output = run_captured(manage_forwarders, 'set', ",".join(job.payload))
+                job.done.set()
+        flush_timings()
+
+    def worker(self):
+        while True:
+            with self.queue:
+                if not self.jobs:
+                    self.queue.wait(DAEMON_WATCH_INTERVAL)
+                pending = bool(self.jobs)
+            if pending:
+                # Let the rest of a burst arrive so it is signed and reloaded once.
+                time.sleep(DAEMON_COALESCE_DELAY)
+                with self.queue:
+                    jobs, self.jobs = self.jobs, []
+                self._apply(jobs)
+            try:
+                self.refresh()
+            except (SystemExit, OSError):
+                print("Warning: could not re-read the configuration; keeping the previous state.", file=sys.stderr)
+
+class DaemonRequestHandler(BaseHTTPRequestHandler):
+    server_version = "dns-handler"
+
+    def address_string(self):
+        return "unix"
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"null")
+
+    def _wait(self, job, wait):
+        if not wait:
+            return self._send(202, {'queued': True})
+        if not job.done.wait(DAEMON_REQUEST_TIMEOUT):
+            return self._send(504, {'error': "Timed out waiting for the change to be applied", 'queued': True})
+        self._send(200 if job.ok else 500, {'ok': job.ok, 'output': job.output})
+
+    def do_GET(self):
+        daemon = self.server.zone_daemon
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        if url.path == "/status":
+            self._send(200, daemon.status())
+        elif url.path == "/records":
+            param = lambda name: (query.get(name) or [None])[0]
+            rtype = param('type')
+            if rtype is not None and rtype.upper() not in RECORD_TYPES:
+                return self._send(400, {'error': f"Unsupported record type '{rtype}'"})
+            try:
+                matches = record_matcher(param('host'), param('address'), rtype and rtype.upper())
+                offset = max(0, int(param('offset') or 0))
+                limit = min(max(1, int(param('limit') or RECORDS_PAGE_SIZE)), RECORDS_MAX_PAGE)
+            except ValueError as e:
+                return self._send(400, {'error': str(e)})
+            try:
+                domain, total, records = daemon.records(param('zone'), matches, offset, limit)
+            except KeyError:
+                return self._send(404, {'error': "Unknown zone"})
+            self._send(200, {
+                'domain': domain,
+                'records': records,
+                'total': total,
+                'offset': offset,
+                'limit': limit,
+                'next_offset': offset + limit if offset + limit < total else None,
+            })
+        elif url.path == "/forwarders":
+            self._send(200, {'forwarders': daemon.forwarders})
+        elif url.path == "/timings":
+            self._send(200, {'bounds': list(TIMING_BUCKETS), 'phases': timings_report()})
+        else:
+            self._send(404, {'error': "Not found"})
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/records":
+            return self._send(404, {'error': "Not found"})
+        try:
+            data = self._read_json()
+            records = records_from_json(data)
+        except ValueError as e:
+            return self._send(400, {'error': str(e)})
+        if not records:
+            return self._send(400, {'error': "No records given"})
+        error = self.server.zone_daemon.validate_records(records)
+        if error:
+            return self._send(400, {'error': error})
+        job = self.server.zone_daemon.submit('records', records)
+        self._wait(job, not isinstance(data, dict) or data.get('wait', True))
+
+    def do_PUT(self):
+        if urlparse(self.path).path != "/forwarders":
+            return self._send(404, {'error': "Not found"})
+        try:
+            data = self._read_json()
+            ip_list = data.get('forwarders') if isinstance(data, dict) else data
+            if not isinstance(ip_list, list) or not ip_list:
+                raise ValueError("Expected {\"forwarders\": [\"IP1\", \"IP2\"]}")
+            for ip in ip_list:
+                if ipaddress.ip_address(str(ip)).version != 4:
+                    raise ValueError(f"'{ip}' is not an IPv4 address")
+        except ValueError as e:
+            return self._send(400, {'error': str(e)})
+        job = self.server.zone_daemon.submit('forwarders', [str(ip) for ip in ip_list])
+        self._wait(job, data.get('wait', True) if isinstance(data, dict) else True)
+
+def run_daemon(socket_path=None):
+    socket_path = socket_path or DAEMON_SOCKET
+    daemon = ZoneDaemon()
+    threading.Thread(target=daemon.worker, name="zone-worker", daemon=True).start()
+
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    server = ThreadingUnixStreamServer(socket_path, DaemonRequestHandler)
+    server.daemon_threads = True
+    server.zone_daemon = daemon
+    try:
+        os.chown(socket_path, 0, grp.getgrnam(DAEMON_SOCKET_GROUP).gr_gid)
+    except KeyError:
+        pass
+    os.chmod(socket_path, 0o660)
+
+    print(f"Managing zone(s) {', '.join(domain for domain, _ in daemon.zones)} on {socket_path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.remove(socket_path)
 
 def main():
     check_root()
     args = parse_arguments()
     bind_uid, bind_gid = get_bind_uid_gid()
 
+    if args.timings:
+        print(json.dumps({'bounds': list(TIMING_BUCKETS), 'phases': timings_report()}, indent=2))
+        sys.exit(0)
+
+    # Runs end with sys.exit on every path; the phases they timed are saved then.
+    atexit.register(flush_timings)
+
+    if args.daemon:
+        run_daemon()
+        sys.exit(0)
+
     # --- FLOW 1: Forwarder Management ---
     if args.list_fwd:
         manage_forwarders('list')
@@ -404,41 +1947,50 @@ def main():
         sys.exit(0)
 
     # --- FLOW 2: Zone Management ---
-    domain, zone_file_path = extract_zone_info()
+    zones = extract_zones()
+    selected = select_zones(zones, args.zone)
 
     if args.list:
-        print(f"Listing records for zone: {domain}")
-        list_zone_records(zone_file_path)
+        try:
+            matches = record_matcher(args.host, args.address, args.type)
+        except ValueError as e:
+            print(f"Error: Invalid --address: {e}")
+            sys.exit(1)
+        if args.format != "table":
+            export_zone_records(selected, args.format, matches)
+            sys.exit(0)
+        for domain, zone_file_path in selected:
+            print(f"Listing records for zone: {domain}")
+            list_zone_records(zone_file_path, domain, matches)
+        sys.exit(0)
+
+    if args.status:
+        for index, (domain, zone_file_path) in enumerate(selected):
+            if index:
+                print()
+            state = load_state(domain)
+            show_status(domain, zone_file_path, state)
+            save_state(domain, state)
         sys.exit(0)
 
-    # Parse user records
+    # Parse user records and route them to their zones
     user_records = []
     if args.record:
-        for item in args.record:
-            parts = item.split(',')
-            if len(parts) < 3:
-                print(f"Error: Invalid record format '{item}'. Must be: HOSTNAME,IP,COMMENT")
-                sys.exit(1)
-            user_records.append({
-                'host': parts[0].strip(), 
-                'ip': parts[1].strip(), 
-                'comment': ",".join(parts[2:]).strip()
-            })
-
-    print(f"Managing zone: {domain}")
+        user_records.extend(parse_record_spec(item, args.type) for item in args.record)
+    if args.batch:
+        user_records.extend(load_batch_records(args.batch))
+    routed = route_records(user_records, [domain for domain, _ in zones],
+                           selected[0][0] if args.zone else default_zone(zones))
 
-    # Ensure DNSSEC keys are valid (auto-rotate if expired)
-    zsk_key, ksk_key = ensure_dnssec_keys(domain, force_rotation=args.rotate_keys)
+    # Record changes touch only their zones; maintenance flags apply to every selected zone.
+    maintenance = args.rotate_keys or args.rollover or args.signing_mode or args.rotate_salt
+    targets = {domain for domain, _ in selected} if maintenance or not routed else set()
+    targets |= set(routed)
+    jobs = [(domain, zone_file_path, routed.get(domain, []))
+            for domain, zone_file_path in zones if domain in targets]
 
-    # Update zone file with records and keys
-    if user_records or args.rotate_keys:
-        update_zone_file(zone_file_path, user_records, zsk_key, ksk_key)
-    
-    # Always sign the zone when making changes
-    sign_zone(domain, zone_file_path)
-    
-    # Restart BIND9
-    restart_service()
+    manage_zones(jobs, rotate_keys=args.rotate_keys,
+                 signing_mode=args.signing_mode, rotate_salt=args.rotate_salt)
 
     print("Operation completed successfully.")
 
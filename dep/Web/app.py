@@ -1,37 +1,35 @@
 import os
+import hmac
 import json
-import subprocess
-from flask import Flask, jsonify, render_template, request, redirect, url_for, flash
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from urllib.parse import urlencode
+from flask import Flask, Response, g, jsonify, render_template, request, redirect, session, url_for, flash
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
-from flask_session import Session
+from logtail import FollowerRegistry
+from loghelper import ALLOWED_LOGS, open_log
+from logfilter import filter_from_args
+from droplog import DropStore, DropIngester, PAGE_SIZE, parse_time_arg
+from dropstats import DropStats, WINDOWS, DEFAULT_TOP
+from eve import AlertStore, EveIngester, EVE_PATTERN
+from dnsclient import DnsClient, DnsUnavailable
+from sessiondb import Database, SqliteSessionInterface, UserStore
+from metrics import CONTENT_TYPE, Registry
 
 # --- Configuração da Aplicação ---
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'uma-chave-secreta-muito-dificil-de-adivinhar'
 
-# --- Configuração de Sessões de Servidor ---
-app.config['SESSION_TYPE'] = 'filesystem'
-app.config['SESSION_PERMANENT'] = False
-app.config['SESSION_USE_SIGNER'] = True
-app.config['SESSION_FILE_DIR'] = './flask_session'
-Session(app)
-
-# --- Arquivo de Configuração de Usuário ---
+# --- Sessões de Servidor e Usuários ---
+# Banco SQLite compartilhado entre os workers; o config.json antigo é migrado uma vez.
+PANEL_DB = 'panel.db'
 CONFIG_FILE = 'config.json'
-users_db = {}
-
-def load_config():
-    global users_db
-    if os.path.exists(CONFIG_FILE):
-        with open(CONFIG_FILE, 'r') as f:
-            users_db = json.load(f)
-    else:
-        users_db = {}
-
-def save_config():
-    with open(CONFIG_FILE, 'w') as f:
-        json.dump(users_db, f, indent=4)
+panel_db = Database(PANEL_DB)
+app.session_interface = SqliteSessionInterface(panel_db)
+user_store = UserStore(panel_db)
+user_store.import_json(CONFIG_FILE)
 
 # --- Gerenciamento de Login ---
 login_manager = LoginManager()
@@ -46,23 +44,97 @@ class User(UserMixin):
 
 @login_manager.user_loader
 def load_user(user_id):
-    if user_id in users_db:
-        return User(id=user_id, name=users_db[user_id]['name'])
+    user_data = user_store.get(user_id)
+    if user_data:
+        return User(id=user_id, name=user_data['name'])
     return None
 
+# --- Métricas (/metrics) ---
+# Sem login: exige o token de SPIRAL_METRICS_TOKEN no cabeçalho Authorization
+# ("Bearer <token>"); SPIRAL_METRICS_ALLOW_LOCAL=1 libera 127.0.0.1 sem token.
+METRICS_TOKEN = os.environ.get('SPIRAL_METRICS_TOKEN')
+# Atrás de um proxy reverso local toda requisição vem de 127.0.0.1: a isenção é opcional.
+METRICS_ALLOW_LOCAL = os.environ.get('SPIRAL_METRICS_ALLOW_LOCAL') == '1'
+LOCAL_ADDRESSES = ('127.0.0.1', '::1')
+DNS_METRICS_TIMEOUT = 2
+
+metrics = Registry()
+http_requests = metrics.counter(
+    'spiral_http_requests_total', 'Requisições atendidas.', ('method', 'endpoint', 'status'))
+http_latency = metrics.histogram(
+    'spiral_http_request_duration_seconds', 'Tempo até a resposta (início do stream no SSE).', ('endpoint',))
+log_reads = metrics.histogram(
+    'spiral_log_read_duration_seconds', 'Leituras de log no pool de arquivos.', ('log', 'filtered'))
+log_read_bytes = metrics.counter(
+    'spiral_log_read_bytes_total', 'Bytes devolvidos pelas leituras de log.', ('log',))
+log_read_failures = metrics.counter(
+    'spiral_log_read_failures_total', 'Leituras de log recusadas ou com erro.', ('log', 'reason'))
+reads_in_flight = metrics.gauge(
+    'spiral_file_reads_in_flight', 'Leituras no pool de arquivos (executando ou na fila).')
+streams_active = metrics.gauge(
+    'spiral_log_streams_active', 'Streams SSE abertos.')
+dns_latency = metrics.histogram(
+    'spiral_dns_request_duration_seconds', 'Chamadas à API do handler.py --daemon.', ('method', 'path', 'status'),
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300))
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request(response):
+    start = g.pop('request_start', None)
+    if start is not None:
+        endpoint = request.endpoint or 'unmatched'
+        http_latency.observe(time.perf_counter() - start, endpoint)
+        http_requests.inc(request.method, endpoint, response.status_code)
+    return response
+
+def metrics_allowed():
+    if METRICS_ALLOW_LOCAL and request.remote_addr in LOCAL_ADDRESSES:
+        return True
+    auth = request.headers.get('Authorization', '')
+    return bool(METRICS_TOKEN) and hmac.compare_digest(auth.encode(), f'Bearer {METRICS_TOKEN}'.encode())
+
+def dns_phase_metrics():
+    """Histogramas das fases do handler.py (checagem de chaves, reescrita, assinatura, reload...)."""
+    try:
+        status, data = dns_client.request('GET', '/timings', timeout=DNS_METRICS_TIMEOUT)
+    except DnsUnavailable:
+        return ''
+    if status != 200:
+        return ''
+    phases = Registry()
+    durations = phases.histogram('spiral_dns_phase_duration_seconds',
+                                 'Duração das fases de alteração de DNS (acumulada pelo handler.py).',
+                                 ('phase',), buckets=data['bounds'])
+    failures = phases.counter('spiral_dns_phase_failures_total', 'Fases de DNS que falharam.', ('phase',))
+    for phase, report in data['phases'].items():
+        cumulative = [report['buckets'][key] for key in list(map(str, data['bounds'])) + ['+Inf']]
+        counts = [n - previous for n, previous in zip(cumulative, [0] + cumulative[:-1])]
+        durations.set_series(counts, report['sum'], report['count'], phase)
+        failures.inc(phase, amount=report['failures'])
+    return phases.render()
+
+@app.route('/metrics')
+def metrics_endpoint():
+    if not metrics_allowed():
+        return jsonify({"error": "Forbidden."}), 403
+    return Response(metrics.render() + dns_phase_metrics(), content_type=CONTENT_TYPE)
+
 # --- Verificação de Setup Inicial ---
 @app.before_request
 def check_for_setup():
-    if request.endpoint == 'setup' or request.endpoint == 'static':
+    if request.endpoint in ('setup', 'static', 'metrics_endpoint'):
         return
-    if not os.path.exists(CONFIG_FILE):
+    if not user_store.has_users():
         return redirect(url_for('setup'))
 
 # --- Rotas da Aplicação ---
 
 @app.route('/setup', methods=['GET', 'POST'])
 def setup():
-    if os.path.exists(CONFIG_FILE):
+    if user_store.has_users():
         return redirect(url_for('login'))
 
     if request.method == 'POST':
@@ -76,11 +148,7 @@ def setup():
             flash('As senhas não coincidem.', 'error')
             return render_template('setup.html')
         
-        users_db['admin'] = {
-            'password_hash': generate_password_hash(password),
-            'name': 'Administrador'
-        }
-        save_config()
+        user_store.set('admin', 'Administrador', generate_password_hash(password))
         
         flash('Senha do administrador configurada com sucesso! Por favor, faça o login.', 'success')
         return redirect(url_for('login'))
@@ -95,10 +163,11 @@ def login():
     if request.method == 'POST':
         username = request.form['username']
         password = request.form['password']
-        user_data = users_db.get(username)
+        user_data = user_store.get(username)
 
         if user_data and check_password_hash(user_data['password_hash'], password):
             user = User(id=username, name=user_data['name'])
+            app.session_interface.regenerate(session)
             login_user(user)
             return redirect(url_for('dashboard'))
         else:
@@ -118,12 +187,47 @@ def dashboard():
     return render_template('index.html', allowed_logs=ALLOWED_LOGS.keys())
 
 # --- API de Logs ---
-ALLOWED_LOGS = {
-    'nftables': '/var/log/nftables.log',
-    'syslog': '/var/log/syslog',
-    'auth': '/var/log/auth.log',
-}
 DEFAULT_LINES = 150
+STREAM_KEEPALIVE = 15
+
+# Descritores persistentes por log; a rotação é detectada pelo inode.
+log_followers = FollowerRegistry(ALLOWED_LOGS, opener=open_log)
+
+# --- Servidor e Leituras de Arquivo ---
+# Cada conexão SSE ocupa uma thread do servidor; o limite de streams garante
+# que sempre sobrem threads para as demais requisições (o navegador volta ao
+# polling quando o stream é recusado). As leituras de log rodam num pool
+# limitado e com timeout, para um arquivo lento não prender todas as threads.
+WEB_THREADS = 64
+MAX_STREAMS = 32
+READ_WORKERS = 8
+READ_QUEUE = 32
+READ_TIMEOUT = 10
+
+file_reads = ThreadPoolExecutor(max_workers=READ_WORKERS, thread_name_prefix='file-read')
+read_slots = threading.BoundedSemaphore(READ_WORKERS + READ_QUEUE)
+stream_slots = threading.BoundedSemaphore(MAX_STREAMS)
+
+class ReadBusy(Exception):
+    pass
+
+def run_read(func, *args):
+    """Executa uma leitura de arquivo no pool limitado; TimeoutError se demorar demais."""
+    if not read_slots.acquire(timeout=READ_TIMEOUT):
+        raise ReadBusy()
+    reads_in_flight.inc()
+    try:
+        future = file_reads.submit(func, *args)
+    except BaseException:
+        reads_in_flight.dec()
+        read_slots.release()
+        raise
+    # A vaga só é devolvida quando a leitura termina de fato, mesmo após o timeout.
+    def release(_):
+        reads_in_flight.dec()
+        read_slots.release()
+    future.add_done_callback(release)
+    return future.result(timeout=READ_TIMEOUT)
 
 @app.route('/api/logs/<log_name>')
 @login_required
@@ -136,13 +240,230 @@ def get_logs(log_name):
         return jsonify({"error": f"Log file not found at {log_path}"}), 404
 
     try:
-        command = ['sudo', 'tail', '-n', str(DEFAULT_LINES), log_path]
-        result = subprocess.run(command, capture_output=True, text=True, check=True)
-        return jsonify({"log_name": log_name, "content": result.stdout})
+        log_filter = filter_from_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": "Invalid filter.", "details": str(e)}), 400
+    keep = log_filter.accepts_bytes if log_filter.active else None
+
+    try:
+        with log_reads.time(log_name, 'yes' if keep else 'no'):
+            data, cursor, reset = run_read(log_followers.read, log_name, request.args.get('cursor'), DEFAULT_LINES, keep)
+        log_read_bytes.inc(log_name, amount=len(data))
+        return jsonify({
+            "log_name": log_name,
+            "content": render_lines(data.decode('utf-8', errors='replace'), log_filter, request.args.get('format')),
+            "cursor": cursor,
+            "reset": reset,
+        })
+    except ReadBusy:
+        log_read_failures.inc(log_name, 'busy')
+        return jsonify({"error": "Server busy, try again."}), 503
+    except FutureTimeout:
+        log_read_failures.inc(log_name, 'timeout')
+        return jsonify({"error": "Timed out reading log file."}), 504
+    except Exception as e:
+        log_read_failures.inc(log_name, 'error')
+        return jsonify({"error": "Failed to read log file.", "details": str(e)}), 500
+
+def render_lines(content, log_filter, fmt):
+    # format=html devolve as linhas já escapadas e coloridas, prontas para inserir.
+    if fmt != 'html':
+        return content
+    return log_filter.render(content.splitlines())
+
+def sse_event(payload, event=None):
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(payload)}\n\n"
+
+@app.route('/api/logs/<log_name>/stream')
+@login_required
+def stream_logs(log_name):
+    if log_name not in ALLOWED_LOGS:
+        return jsonify({"error": "Log file not allowed."}), 404
+
+    log_path = ALLOWED_LOGS[log_name]
+    if not os.path.exists(log_path):
+        return jsonify({"error": f"Log file not found at {log_path}"}), 404
+
+    try:
+        log_filter = filter_from_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": "Invalid filter.", "details": str(e)}), 400
+    fmt = request.args.get('format')
+
+    if not stream_slots.acquire(blocking=False):
+        log_read_failures.inc(log_name, 'streams')
+        return jsonify({"error": "Too many live streams; use polling."}), 503
+    streams_active.inc()
+
+    broadcaster = log_followers.broadcaster(log_name)
+    subscription = broadcaster.subscribe(log_filter.accepts if log_filter.active else None)
+    try:
+        keep = log_filter.accepts_bytes if log_filter.active else None
+        with log_reads.time(log_name, 'yes' if keep else 'no'):
+            data, cursor = run_read(log_followers.get(log_name).tail, DEFAULT_LINES, keep)
     except Exception as e:
+        log_read_failures.inc(log_name, 'error')
+        broadcaster.unsubscribe(subscription)
+        streams_active.dec()
+        stream_slots.release()
         return jsonify({"error": "Failed to read log file.", "details": str(e)}), 500
 
+    def generate():
+        try:
+            content = render_lines(data.decode('utf-8', errors='replace'), log_filter, fmt)
+            yield sse_event({"log_name": log_name, "content": content, "cursor": cursor}, 'reset')
+            dropped = 0
+            while True:
+                lines = subscription.get(STREAM_KEEPALIVE)
+                if not lines:
+                    yield ": keepalive\n\n"
+                    continue
+                payload = {"content": render_lines("\n".join(lines) + "\n", log_filter, fmt)}
+                if subscription.dropped != dropped:
+                    payload["dropped"] = subscription.dropped - dropped
+                    dropped = subscription.dropped
+                yield sse_event(payload)
+        finally:
+            broadcaster.unsubscribe(subscription)
+            streams_active.dec()
+            stream_slots.release()
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+
+# --- Histórico de Descartes ---
+DROP_DB = 'drops.db'
+drop_store = DropStore(DROP_DB)
+drop_ingester = DropIngester(drop_store, ALLOWED_LOGS['nftables'], opener=open_log)
+drop_stats = DropStats()
+drop_ingester.listeners.append(drop_stats.consume)
+
+@app.route('/api/drops')
+@login_required
+def search_drops():
+    args = request.args
+    try:
+        items, next_cursor = drop_store.search(
+            prefix=args.get('prefix'),
+            src=args.get('src'),
+            dst=args.get('dst'),
+            dpt=args.get('dpt', type=int),
+            proto=args.get('proto'),
+            iface=args.get('iface'),
+            since=parse_time_arg(args.get('since')),
+            until=parse_time_arg(args.get('until')),
+            cursor=args.get('cursor'),
+            limit=args.get('limit', PAGE_SIZE, type=int),
+        )
+    except ValueError as e:
+        return jsonify({"error": "Invalid filter.", "details": str(e)}), 400
+    return jsonify({"items": items, "next_cursor": next_cursor})
+
+@app.route('/api/drops/stats')
+@login_required
+def drop_statistics():
+    windows = request.args.getlist('window')
+    unknown = [w for w in windows if w not in WINDOWS]
+    if unknown:
+        return jsonify({"error": f"Unknown window: {', '.join(unknown)}", "allowed": list(WINDOWS)}), 400
+    top = max(1, min(request.args.get('top', DEFAULT_TOP, type=int), 50))
+    return jsonify({"generated_at": time.time(), "windows": drop_stats.snapshot(windows, top)})
+
+# --- Alertas do Suricata ---
+ALERT_DB = 'alerts.db'
+alert_store = AlertStore(ALERT_DB)
+eve_ingester = EveIngester(alert_store, EVE_PATTERN)
+
+@app.route('/alerts')
+@login_required
+def alerts():
+    return render_template('alerts.html')
+
+@app.route('/api/alerts')
+@login_required
+def search_alerts():
+    args = request.args
+    try:
+        items, next_cursor = alert_store.search(
+            signature_id=args.get('signature_id', type=int),
+            severity=args.get('severity', type=int),
+            src=args.get('src'),
+            dst=args.get('dst'),
+            since=parse_time_arg(args.get('since')),
+            until=parse_time_arg(args.get('until')),
+            cursor=args.get('cursor'),
+            limit=args.get('limit', PAGE_SIZE, type=int),
+        )
+    except ValueError as e:
+        return jsonify({"error": "Invalid filter.", "details": str(e)}), 400
+    return jsonify({"items": items, "next_cursor": next_cursor})
+
+@app.route('/api/alerts/summary')
+@login_required
+def alert_summary():
+    try:
+        summary = alert_store.summary(
+            since=parse_time_arg(request.args.get('since')),
+            until=parse_time_arg(request.args.get('until')),
+            top=max(1, min(request.args.get('top', 10, type=int), 100)),
+        )
+    except ValueError as e:
+        return jsonify({"error": "Invalid filter.", "details": str(e)}), 400
+    return jsonify(summary)
+
+# --- Gerenciamento de DNS (handler.py --daemon) ---
+dns_client = DnsClient()
+DNS_RECORD_PARAMS = ('zone', 'type', 'host', 'address', 'offset', 'limit')
+
+def dns_proxy(method, url, payload=None):
+    start = time.perf_counter()
+    path = url.split('?', 1)[0]
+    try:
+        status, data = dns_client.request(method, url, payload)
+    except DnsUnavailable as e:
+        dns_latency.observe(time.perf_counter() - start, method, path, 'unavailable')
+        return jsonify({"error": "Serviço de DNS indisponível.", "details": str(e)}), 503
+    dns_latency.observe(time.perf_counter() - start, method, path, status)
+    return jsonify(data), status
+
+@app.route('/api/dns/status')
+@login_required
+def dns_status():
+    return dns_proxy('GET', '/status')
+
+@app.route('/api/dns/records', methods=['GET', 'POST'])
+@login_required
+def dns_records():
+    if request.method == 'POST':
+        return dns_proxy('POST', '/records', request.get_json(silent=True))
+    # Filtros (host="web*", address=IP ou CIDR, type) e paginação (offset, limit) são aplicados pelo daemon.
+    params = {key: request.args[key] for key in DNS_RECORD_PARAMS if request.args.get(key)}
+    return dns_proxy('GET', '/records' + ('?' + urlencode(params) if params else ''))
+
+@app.route('/api/dns/forwarders', methods=['GET', 'PUT'])
+@login_required
+def dns_forwarders():
+    if request.method == 'PUT':
+        return dns_proxy('PUT', '/forwarders', request.get_json(silent=True))
+    return dns_proxy('GET', '/forwarders')
+
+def start_background_tasks():
+    drop_ingester.start()
+    eve_ingester.start()
+
+def serve(host='0.0.0.0', port=5000):
+    try:
+        from waitress import serve as waitress_serve
+    except ImportError:
+        # Sem o waitress: servidor do Flask, uma thread por requisição.
+        app.run(host=host, port=port, threaded=True)
+        return
+    waitress_serve(app, host=host, port=port, threads=WEB_THREADS, channel_timeout=STREAM_KEEPALIVE * 4)
+
 # --- Ponto de Entrada ---
 if __name__ == '__main__':
-    load_config()
-    app.run(host='0.0.0.0', port=5000)
\ No newline at end of file
+    start_background_tasks()
+    serve()
\ No newline at end of file
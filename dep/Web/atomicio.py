@@ -0,0 +1,13 @@
+import fcntl
+from contextlib import contextmanager
+
+# --- Lock Consultivo entre Processos ---
+# Serializa os workers em operações de arquivo feitas uma única vez (ex.: a
+# migração do config.json para o SQLite).
+
+
+@contextmanager
+def file_lock(path):
+    with open(path + '.lock', 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        yield
@@ -0,0 +1,44 @@
+import json
+import socket
+import http.client
+
+# --- Cliente da API local do handler.py (modo --daemon) ---
+# O handler do BIND escuta HTTP num socket Unix; a interface web gerencia
+# registros e forwarders por ele, sem disparar um processo por alteração.
+
+DNS_SOCKET = '/run/dns-handler.sock'
+TIMEOUT = 330  # um pouco acima do tempo que o daemon espera a alteração ser aplicada
+
+
+class DnsUnavailable(Exception):
+    pass
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout=TIMEOUT):
+        super().__init__('localhost', timeout=timeout)
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+
+class DnsClient:
+    def __init__(self, path=DNS_SOCKET):
+        self.path = path
+
+    def request(self, method, url, payload=None, timeout=TIMEOUT):
+        """Retorna (status, json) da resposta do daemon."""
+        body = json.dumps(payload).encode() if payload is not None else None
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        conn = UnixHTTPConnection(self.path, timeout)
+        try:
+            conn.request(method, url, body=body, headers=headers)
+            response = conn.getresponse()
+            return response.status, json.loads(response.read() or b'{}')
+        except (OSError, http.client.HTTPException) as e:
+            raise DnsUnavailable(str(e))
+        finally:
+            conn.close()
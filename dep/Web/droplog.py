@@ -0,0 +1,179 @@
+import os
+import re
+import gzip
+import time
+import argparse
+from datetime import datetime
+
+from ingest import SqliteStore, Ingester, PAGE_SIZE
+
+# --- Histórico de Descartes do nftables ---
+# Linhas do kernel com os prefixos dos scripts de firewall são convertidas em
+# campos estruturados e gravadas em SQLite, indexadas por tempo, origem e porta.
+
+DROP_PREFIXES = ('INPUT_DROP', 'FORWARD_DROP', 'OUTPUT_DROP')
+RETENTION_DAYS = 30
+BATCH_SIZE = 5000
+
+RE_PREFIX = re.compile(r'\b(' + '|'.join(DROP_PREFIXES) + r'):')
+RE_FIELD = re.compile(r'\b(IN|OUT|SRC|DST|PROTO|SPT|DPT)=(\S*)')
+RE_ISO_TS = re.compile(r'^(\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d(?:\.\d+)?(?:Z|[+-]\d\d:?\d\d)?)\s')
+RE_BSD_TS = re.compile(r'^([A-Z][a-z]{2}\s+\d{1,2} \d\d:\d\d:\d\d)\s')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS drops (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    prefix TEXT NOT NULL,
+    iface_in TEXT,
+    iface_out TEXT,
+    src TEXT,
+    dst TEXT,
+    proto TEXT,
+    spt INTEGER,
+    dpt INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_drops_ts ON drops(ts);
+CREATE INDEX IF NOT EXISTS idx_drops_src_ts ON drops(src, ts);
+CREATE INDEX IF NOT EXISTS idx_drops_dpt_ts ON drops(dpt, ts);
+"""
+
+COLUMNS = ('id', 'ts', 'prefix', 'iface_in', 'iface_out', 'src', 'dst', 'proto', 'spt', 'dpt')
+
+
+def parse_timestamp(line, now=None):
+    match = RE_ISO_TS.match(line)
+    if match:
+        value = match.group(1).replace('Z', '+00:00')
+        try:
+            return datetime.fromisoformat(value).timestamp()
+        except ValueError:
+            return None
+
+    match = RE_BSD_TS.match(line)
+    if match:
+        # O formato tradicional do syslog não traz o ano.
+        now = now or time.time()
+        year = datetime.fromtimestamp(now).year
+        try:
+            ts = datetime.strptime(f"{year} {match.group(1)}", '%Y %b %d %H:%M:%S').timestamp()
+        except ValueError:
+            return None
+        if ts > now + 86400:
+            ts = datetime.strptime(f"{year - 1} {match.group(1)}", '%Y %b %d %H:%M:%S').timestamp()
+        return ts
+    return None
+
+
+def to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_drop_line(line, now=None):
+    match = RE_PREFIX.search(line)
+    if not match:
+        return None
+    fields = dict(RE_FIELD.findall(line[match.end():]))
+    ts = parse_timestamp(line, now)
+    return {
+        'ts': ts if ts is not None else (now or time.time()),
+        'prefix': match.group(1),
+        'iface_in': fields.get('IN') or None,
+        'iface_out': fields.get('OUT') or None,
+        'src': fields.get('SRC'),
+        'dst': fields.get('DST'),
+        'proto': fields.get('PROTO'),
+        'spt': to_int(fields.get('SPT')),
+        'dpt': to_int(fields.get('DPT')),
+    }
+
+
+def parse_time_arg(value):
+    # Aceita epoch ou ISO 8601.
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+
+
+class DropStore(SqliteStore):
+    schema = SCHEMA
+
+    def insert(self, conn, records):
+        conn.executemany(
+            'INSERT INTO drops (ts, prefix, iface_in, iface_out, src, dst, proto, spt, dpt) '
+            'VALUES (:ts, :prefix, :iface_in, :iface_out, :src, :dst, :proto, :spt, :dpt)',
+            records,
+        )
+
+    def prune(self, days=RETENTION_DAYS):
+        with self.connect() as conn:
+            conn.execute('DELETE FROM drops WHERE ts < ?', (time.time() - days * 86400,))
+
+    def search(self, prefix=None, src=None, dst=None, dpt=None, proto=None, iface=None,
+               since=None, until=None, cursor=None, limit=PAGE_SIZE):
+        where, params = [], []
+        for column, value in (('prefix', prefix), ('src', src), ('dst', dst), ('dpt', dpt), ('proto', proto)):
+            if value is not None:
+                where.append(f'{column} = ?')
+                params.append(value)
+        if iface is not None:
+            where.append('(iface_in = ? OR iface_out = ?)')
+            params.extend([iface, iface])
+        if since is not None:
+            where.append('ts >= ?')
+            params.append(since)
+        if until is not None:
+            where.append('ts < ?')
+            params.append(until)
+        return self.page('drops', COLUMNS, where, params, cursor, limit)
+
+
+class DropIngester(Ingester):
+    """Acompanha o log do nftables e grava os descartes em lotes."""
+
+    name = 'drop-ingester'
+
+    def parse(self, data):
+        now = time.time()
+        records = []
+        for line in data.decode('utf-8', errors='replace').splitlines():
+            record = parse_drop_line(line, now)
+            if record:
+                records.append(record)
+        return records
+
+
+def import_files(store, paths):
+    """Importa logs girados (inclusive .gz) para o histórico."""
+    total = 0
+    for path in paths:
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rt', errors='replace') as f, store.connect() as conn:
+            batch = []
+            now = os.path.getmtime(path)
+            for line in f:
+                record = parse_drop_line(line, now)
+                if record:
+                    batch.append(record)
+                if len(batch) >= BATCH_SIZE:
+                    store.insert(conn, batch)
+                    total += len(batch)
+                    batch = []
+            store.insert(conn, batch)
+            total += len(batch)
+        print(f"{path}: ok")
+    print(f"{total} registros importados.")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Importa logs do nftables para o histórico de descartes.')
+    parser.add_argument('--db', default='drops.db', help='Banco SQLite do histórico.')
+    parser.add_argument('files', nargs='+', help='Arquivos de log (ex.: /var/log/nftables.log.2.gz).')
+    args = parser.parse_args()
+    import_files(DropStore(args.db), args.files)
@@ -0,0 +1,114 @@
+import time
+import threading
+
+# --- Estatísticas de Descartes em Tempo Real ---
+# Janelas deslizantes (1m/5m/1h) divididas em baldes. Cada balde guarda um
+# resumo Space-Saving de tamanho fixo por dimensão, então a memória não cresce
+# mesmo sob varredura com milhares de origens distintas.
+
+WINDOWS = {
+    '1m': (60, 6),
+    '5m': (300, 10),
+    '1h': (3600, 12),
+}
+DIMENSIONS = ('src', 'dpt', 'chain', 'iface')
+SUMMARY_SIZE = 64
+DEFAULT_TOP = 10
+
+
+class SpaceSaving:
+    """Top-K aproximado (Metwally et al.): no máximo k chaves, erro limitado pela menor contagem."""
+
+    def __init__(self, k=SUMMARY_SIZE):
+        self.k = k
+        self.counts = {}
+
+    def add(self, key, n=1):
+        counts = self.counts
+        if key in counts:
+            counts[key] += n
+        elif len(counts) < self.k:
+            counts[key] = n
+        else:
+            victim = min(counts, key=counts.get)
+            counts[key] = counts.pop(victim) + n
+
+
+class Bucket:
+    __slots__ = ('index', 'total', 'dims')
+
+    def __init__(self, index):
+        self.index = index
+        self.total = 0
+        self.dims = {dim: SpaceSaving() for dim in DIMENSIONS}
+
+
+class RollingWindow:
+    def __init__(self, seconds, buckets):
+        self.seconds = seconds
+        self.width = seconds / buckets
+        self.ring = [None] * buckets
+
+    def add(self, ts, keys, now):
+        index = int(ts // self.width)
+        if index <= int(now // self.width) - len(self.ring):
+            return
+        slot = index % len(self.ring)
+        bucket = self.ring[slot]
+        if bucket is None or bucket.index != index:
+            if bucket is not None and bucket.index > index:
+                return
+            bucket = self.ring[slot] = Bucket(index)
+        bucket.total += 1
+        for dim, key in keys.items():
+            if key is not None:
+                bucket.dims[dim].add(key)
+
+    def snapshot(self, now, top):
+        oldest = int(now // self.width) - len(self.ring)
+        total = 0
+        merged = {dim: {} for dim in DIMENSIONS}
+        for bucket in self.ring:
+            if bucket is None or bucket.index <= oldest:
+                continue
+            total += bucket.total
+            for dim, summary in bucket.dims.items():
+                target = merged[dim]
+                for key, count in summary.counts.items():
+                    target[key] = target.get(key, 0) + count
+
+        result = {'seconds': self.seconds, 'total': total, 'rate': total / self.seconds, 'top': {}}
+        for dim, counts in merged.items():
+            ranked = sorted(counts.items(), key=lambda item: item[1], reverse=True)[:top]
+            result['top'][dim] = [
+                {'key': key, 'count': count, 'rate': count / self.seconds} for key, count in ranked
+            ]
+        return result
+
+
+class DropStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._windows = {name: RollingWindow(*spec) for name, spec in WINDOWS.items()}
+
+    def consume(self, records):
+        now = time.time()
+        with self._lock:
+            for record in records:
+                keys = {
+                    'src': record['src'],
+                    'dpt': record['dpt'],
+                    'chain': record['prefix'],
+                    'iface': record['iface_in'] or record['iface_out'],
+                }
+                for window in self._windows.values():
+                    window.add(record['ts'], keys, now)
+
+    def snapshot(self, windows=None, top=DEFAULT_TOP):
+        now = time.time()
+        with self._lock:
+            return {
+                name: window.snapshot(now, top)
+                for name, window in self._windows.items()
+                if not windows or name in windows
+            }
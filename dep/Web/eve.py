@@ -0,0 +1,155 @@
+import json
+import time
+from datetime import datetime
+
+from ingest import SqliteStore, Ingester, PAGE_SIZE
+
+# --- Alertas do Suricata (eve.json) ---
+# Segue eve.json e, no modo "threaded", os arquivos eve.N.json. Cada lote é
+# interpretado linha a linha e apenas eventos do tipo "alert" são indexados.
+
+EVE_PATTERN = '/var/log/suricata/eve*.json'
+RETENTION_DAYS = 30
+SUMMARY_HOURS = 24
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS alerts (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    signature_id INTEGER,
+    signature TEXT,
+    category TEXT,
+    severity INTEGER,
+    action TEXT,
+    proto TEXT,
+    src_ip TEXT,
+    src_port INTEGER,
+    dest_ip TEXT,
+    dest_port INTEGER,
+    in_iface TEXT,
+    flow_id INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_alerts_ts ON alerts(ts);
+CREATE INDEX IF NOT EXISTS idx_alerts_sid_ts ON alerts(signature_id, ts);
+CREATE INDEX IF NOT EXISTS idx_alerts_severity_ts ON alerts(severity, ts);
+CREATE INDEX IF NOT EXISTS idx_alerts_src_ts ON alerts(src_ip, ts);
+CREATE INDEX IF NOT EXISTS idx_alerts_dest_ts ON alerts(dest_ip, ts);
+"""
+
+COLUMNS = ('id', 'ts', 'signature_id', 'signature', 'category', 'severity', 'action',
+           'proto', 'src_ip', 'src_port', 'dest_ip', 'dest_port', 'in_iface', 'flow_id')
+
+
+def parse_eve_time(value):
+    # O Suricata usa "2024-01-01T10:00:00.123456+0000".
+    try:
+        return datetime.strptime(value, '%Y-%m-%dT%H:%M:%S.%f%z').timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_alert(line):
+    # Filtro barato antes do json.loads: a maioria dos eventos não é alerta.
+    if b'"event_type":"alert"' not in line:
+        return None
+    try:
+        event = json.loads(line)
+    except ValueError:
+        return None
+    if not isinstance(event, dict):
+        return None
+    alert = event.get('alert')
+    if not isinstance(alert, dict):
+        alert = {}
+    ts = parse_eve_time(event.get('timestamp'))
+    return {
+        'ts': ts if ts is not None else time.time(),
+        'signature_id': alert.get('signature_id'),
+        'signature': alert.get('signature'),
+        'category': alert.get('category'),
+        'severity': alert.get('severity'),
+        'action': alert.get('action'),
+        'proto': event.get('proto'),
+        'src_ip': event.get('src_ip'),
+        'src_port': event.get('src_port'),
+        'dest_ip': event.get('dest_ip'),
+        'dest_port': event.get('dest_port'),
+        'in_iface': event.get('in_iface'),
+        'flow_id': event.get('flow_id'),
+    }
+
+
+class AlertStore(SqliteStore):
+    schema = SCHEMA
+
+    def insert(self, conn, records):
+        conn.executemany(
+            'INSERT INTO alerts (ts, signature_id, signature, category, severity, action, proto, '
+            'src_ip, src_port, dest_ip, dest_port, in_iface, flow_id) '
+            'VALUES (:ts, :signature_id, :signature, :category, :severity, :action, :proto, '
+            ':src_ip, :src_port, :dest_ip, :dest_port, :in_iface, :flow_id)',
+            records,
+        )
+
+    def prune(self, days=RETENTION_DAYS):
+        with self.connect() as conn:
+            conn.execute('DELETE FROM alerts WHERE ts < ?', (time.time() - days * 86400,))
+
+    @staticmethod
+    def _filters(signature_id=None, severity=None, src=None, dst=None, since=None, until=None):
+        where, params = [], []
+        for column, value in (('signature_id', signature_id), ('severity', severity),
+                              ('src_ip', src), ('dest_ip', dst)):
+            if value is not None:
+                where.append(f'{column} = ?')
+                params.append(value)
+        if since is not None:
+            where.append('ts >= ?')
+            params.append(since)
+        if until is not None:
+            where.append('ts < ?')
+            params.append(until)
+        return where, params
+
+    def search(self, cursor=None, limit=PAGE_SIZE, **filters):
+        where, params = self._filters(**filters)
+        return self.page('alerts', COLUMNS, where, params, cursor, limit)
+
+    def summary(self, since=None, until=None, top=10):
+        # Assinaturas mais frequentes e totais por severidade no intervalo.
+        if since is None:
+            since = time.time() - SUMMARY_HOURS * 3600
+        where, params = self._filters(since=since, until=until)
+        clause = ' WHERE ' + ' AND '.join(where)
+        with self.connect() as conn:
+            signatures = conn.execute(
+                'SELECT signature_id, signature, severity, COUNT(*) AS hits, MAX(ts) AS last_seen '
+                f'FROM alerts{clause} GROUP BY signature_id ORDER BY hits DESC LIMIT ?',
+                params + [top],
+            ).fetchall()
+            severities = conn.execute(
+                f'SELECT severity, COUNT(*) FROM alerts{clause} GROUP BY severity ORDER BY severity',
+                params,
+            ).fetchall()
+        return {
+            'since': since,
+            'signatures': [
+                dict(zip(('signature_id', 'signature', 'severity', 'hits', 'last_seen'), row))
+                for row in signatures
+            ],
+            'severities': {str(severity): count for severity, count in severities},
+        }
+
+
+class EveIngester(Ingester):
+    """Indexa os alertas do eve.json em lotes, fora das threads de requisição."""
+
+    name = 'eve-ingester'
+
+    def parse(self, data):
+        records = []
+        for line in data.splitlines():
+            record = parse_alert(line)
+            if record:
+                records.append(record)
+        return records
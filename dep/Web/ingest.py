@@ -0,0 +1,228 @@
+import os
+import sys
+import glob
+import time
+import fcntl
+import sqlite3
+import threading
+import traceback
+from contextlib import contextmanager
+
+from logtail import LogFollower, Inotify, MAX_CHUNK, POLL_INTERVAL, parse_cursor, open_binary
+
+# --- Ingestão Contínua de Logs para SQLite ---
+# Base comum dos históricos (descartes do nftables, alertas do Suricata): segue
+# um ou mais arquivos, interpreta em lotes e grava o cursor de leitura na mesma
+# transação dos registros, para retomar de onde parou após um reinício.
+
+STATE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ingest_state (
+    path TEXT PRIMARY KEY,
+    cursor TEXT NOT NULL
+);
+"""
+RESCAN_INTERVAL = 10
+PRUNE_INTERVAL = 3600
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+class SqliteStore:
+    schema = ''
+
+    def __init__(self, path):
+        self.path = path
+        with self.connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(self.schema + STATE_SCHEMA)
+
+    @contextmanager
+    def connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute('PRAGMA synchronous=NORMAL')
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def insert(self, conn, records):
+        raise NotImplementedError
+
+    def prune(self):
+        pass
+
+    def page(self, table, columns, where, params, cursor=None, limit=PAGE_SIZE):
+        """Paginação por chave (ts, id) em ordem decrescente; o cursor é "<ts>:<id>"."""
+        where, params = list(where), list(params)
+        if cursor:
+            ts, _, row_id = cursor.partition(':')
+            where.append('(ts < ? OR (ts = ? AND id < ?))')
+            params.extend([float(ts), float(ts), int(row_id)])
+
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        sql = f"SELECT {', '.join(columns)} FROM {table}"
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY ts DESC, id DESC LIMIT ?'
+        params.append(limit + 1)
+
+        with self.connect() as conn:
+            rows = conn.execute(sql, params).fetchall()
+
+        items = [dict(zip(columns, row)) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = items[-1]
+            next_cursor = f"{last['ts']!r}:{last['id']}"
+        return items, next_cursor
+
+    def load_cursor(self, path):
+        with self.connect() as conn:
+            row = conn.execute('SELECT cursor FROM ingest_state WHERE path = ?', (path,)).fetchone()
+        return row[0] if row else None
+
+    def save_cursor(self, conn, path, cursor):
+        conn.execute('INSERT OR REPLACE INTO ingest_state (path, cursor) VALUES (?, ?)', (path, cursor))
+
+
+class Ingester:
+    """Segue os arquivos que casam com `pattern` e grava os registros de `parse` no store."""
+
+    name = 'ingester'
+
+    def __init__(self, store, pattern, opener=open_binary):
+        self.store = store
+        self.pattern = pattern
+        self.opener = opener
+        # Consumidores dos registros já interpretados (ex.: estatísticas em tempo real).
+        self.listeners = []
+        self._thread = None
+        self._lock_file = None
+
+    def parse(self, data):
+        raise NotImplementedError
+
+    def start(self):
+        # Com vários workers apenas o processo que obtiver o lock faz a ingestão.
+        self._lock_file = open(self.store.path + '.lock', 'w')
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self._lock_file.close()
+            self._lock_file = None
+            return False
+        self._thread = threading.Thread(target=self._supervise, name=self.name, daemon=True)
+        self._thread.start()
+        return True
+
+    def _ingest(self, path, data, cursor):
+        records = self.parse(data)
+        with self.store.connect() as conn:
+            if records:
+                self.store.insert(conn, records)
+            self.store.save_cursor(conn, path, cursor)
+        for listener in self.listeners:
+            listener(records)
+
+    def _resume_rotated(self, path, cursor):
+        # Se o arquivo girou com o serviço parado, termina de ler o antigo (.1).
+        parsed = parse_cursor(cursor)
+        rotated_path = path + '.1'
+        if not parsed or not os.path.exists(rotated_path) or os.stat(rotated_path).st_ino != parsed[0]:
+            return
+        follower = LogFollower(rotated_path, self.opener)
+        try:
+            while True:
+                data, cursor, _ = follower.read_since(cursor)
+                if not data:
+                    break
+                self._ingest(path, data, cursor)
+        finally:
+            follower.close()
+
+    def _rescan(self, followers, cursors):
+        current = set(glob.glob(self.pattern))
+        for path in current - followers.keys():
+            followers[path] = LogFollower(path, self.opener)
+            cursors[path] = self.store.load_cursor(path)
+            if cursors[path]:
+                self._resume_rotated(path, cursors[path])
+        for path in followers.keys() - current:
+            followers.pop(path).close()
+            cursors.pop(path, None)
+
+    def _supervise(self):
+        # Um erro inesperado reinicia o laço em vez de encerrar a ingestão com o lock preso.
+        while True:
+            try:
+                self._run()
+            except Exception:
+                print(f"{self.name}: erro inesperado, reiniciando a ingestão", file=sys.stderr)
+                traceback.print_exc()
+                time.sleep(POLL_INTERVAL)
+
+    def _run(self):
+        try:
+            watcher = Inotify(os.path.dirname(self.pattern))
+        except OSError:
+            watcher = None
+
+        followers, cursors = {}, {}
+        last_scan = last_prune = 0
+
+        try:
+            while True:
+                if time.time() - last_scan > RESCAN_INTERVAL:
+                    try:
+                        self._rescan(followers, cursors)
+                    except (OSError, sqlite3.Error) as e:
+                        print(f"{self.name}: {e}", file=sys.stderr)
+                    last_scan = time.time()
+
+                busy = False
+                for path, follower in followers.items():
+                    cursor = cursors[path]
+                    try:
+                        result = follower.read_since(cursor) if cursor else None
+                        if result is None:
+                            # Sem cursor válido: começa do início do arquivo atual.
+                            cursors[path] = follower.start_cursor()
+                            busy = True
+                            continue
+                        data, new_cursor, _ = result
+                        if data:
+                            try:
+                                self._ingest(path, data, new_cursor)
+                            except (OSError, sqlite3.OperationalError):
+                                raise
+                            except Exception as e:
+                                # Lote que o parser, um listener ou o banco recusam: é descartado
+                                # para não travar a leitura nem derrubar a thread.
+                                print(f"{self.name}: {path}: lote ignorado ({e!r})", file=sys.stderr)
+                            busy = busy or len(data) >= MAX_CHUNK // 2
+                        cursors[path] = new_cursor
+                    except FileNotFoundError:
+                        pass
+                    except (OSError, sqlite3.Error) as e:
+                        # Ex.: loghelper fora do ar ou banco ocupado; tenta de novo na próxima volta.
+                        print(f"{self.name}: {path}: {e}", file=sys.stderr)
+
+                if time.time() - last_prune > PRUNE_INTERVAL:
+                    try:
+                        self.store.prune()
+                    except (OSError, sqlite3.Error) as e:
+                        print(f"{self.name}: limpeza falhou ({e})", file=sys.stderr)
+                    last_prune = time.time()
+
+                if busy:
+                    continue
+                if watcher:
+                    watcher.wait({os.path.basename(path).encode() for path in followers}, POLL_INTERVAL)
+                else:
+                    time.sleep(POLL_INTERVAL)
+        finally:
+            for follower in followers.values():
+                follower.close()
+            if watcher:
+                watcher.close()
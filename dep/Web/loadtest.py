@@ -0,0 +1,116 @@
+"""Teste de carga do endpoint /api/logs/<nome>.
+
+Faz login uma vez, compartilha o cookie de sessão entre N clientes simultâneos
+(cada um com sua própria conexão keep-alive) e mede a latência de cada
+requisição. Ao final mostra p50/p90/p99/máximo, requisições por segundo e erros.
+
+Exemplo (50 clientes durante 30 segundos):
+    python3 loadtest.py --url http://127.0.0.1:5000 --log syslog \\
+        --clients 50 --duration 30 --password <senha>
+"""
+import sys
+import time
+import argparse
+import threading
+import http.client
+from urllib.parse import urlparse, urlencode
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, round(pct / 100 * len(values)) - 1))
+    return values[index]
+
+
+def connect(url):
+    parsed = urlparse(url)
+    cls = http.client.HTTPSConnection if parsed.scheme == 'https' else http.client.HTTPConnection
+    return cls(parsed.hostname, parsed.port, timeout=30)
+
+
+def login(url, user, password):
+    conn = connect(url)
+    body = urlencode({'username': user, 'password': password})
+    conn.request('POST', '/login', body=body, headers={'Content-Type': 'application/x-www-form-urlencoded'})
+    response = conn.getresponse()
+    response.read()
+    conn.close()
+    cookie = response.getheader('Set-Cookie')
+    if response.status not in (200, 302) or not cookie:
+        sys.exit(f"Falha no login (HTTP {response.status}).")
+    return cookie.split(';', 1)[0]
+
+
+class Client(threading.Thread):
+    def __init__(self, url, path, cookie, deadline, requests):
+        super().__init__(daemon=True)
+        self.url = url
+        self.path = path
+        self.headers = {'Cookie': cookie}
+        self.deadline = deadline
+        self.requests = requests
+        self.latencies = []
+        self.errors = 0
+
+    def run(self):
+        conn = connect(self.url)
+        done = 0
+        while time.monotonic() < self.deadline and (self.requests is None or done < self.requests):
+            done += 1
+            start = time.perf_counter()
+            try:
+                conn.request('GET', self.path, headers=self.headers)
+                response = conn.getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException):
+                self.errors += 1
+                conn.close()
+                conn = connect(self.url)
+                continue
+            if response.status != 200:
+                self.errors += 1
+                continue
+            self.latencies.append(time.perf_counter() - start)
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Teste de carga do endpoint de logs.',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__,
+    )
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help='Endereço da aplicação.')
+    parser.add_argument('--log', default='syslog', help='Nome do log (chave de ALLOWED_LOGS).')
+    parser.add_argument('--clients', type=int, default=50, help='Clientes simultâneos (padrão: 50).')
+    parser.add_argument('--duration', type=float, default=30, help='Duração máxima em segundos.')
+    parser.add_argument('--requests', type=int, help='Requisições por cliente (encerra antes da duração).')
+    parser.add_argument('--user', default='admin', help='Usuário do painel.')
+    parser.add_argument('--password', required=True, help='Senha do painel.')
+    args = parser.parse_args()
+
+    cookie = login(args.url, args.user, args.password)
+    path = f'/api/logs/{args.log}'
+    deadline = time.monotonic() + args.duration
+    clients = [Client(args.url, path, cookie, deadline, args.requests) for _ in range(args.clients)]
+
+    start = time.perf_counter()
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(value for client in clients for value in client.latencies)
+    errors = sum(client.errors for client in clients)
+    print(f"Clientes: {args.clients}  Requisições: {len(latencies)}  Erros: {errors}  Tempo: {elapsed:.1f}s")
+    print(f"RPS: {len(latencies) / elapsed:.1f}")
+    for label, pct in (('p50', 50), ('p90', 90), ('p99', 99)):
+        print(f"{label}: {percentile(latencies, pct) * 1000:.1f} ms")
+    print(f"max: {(latencies[-1] if latencies else 0) * 1000:.1f} ms")
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == '__main__':
+    main()
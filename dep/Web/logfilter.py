@@ -0,0 +1,186 @@
+import re
+import html
+import functools
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse
+
+# --- Filtros e Destaques de Logs ---
+# O filtro é montado a partir dos parâmetros da requisição e compilado uma única
+# vez por combinação (cache LRU). As linhas recusadas nem chegam ao navegador, e
+# o destaque de cores é feito aqui em vez de a cada atualização no cliente.
+
+SEVERITY_PATTERNS = {
+    'error': r'\b(?:emerg|emergency|alert|crit|critical|err|error|fatal|panic|fail|failed|failure)\b',
+    'warning': r'\b(?:emerg|emergency|alert|crit|critical|err|error|fatal|panic|fail|failed|failure|warn|warning)\b',
+}
+MAX_PATTERN = 256
+MAX_MATCH_LINE = 2048   # os padrões do usuário só olham o início de cada linha
+FILTER_CACHE = 128
+
+RE_HIGHLIGHT = re.compile(
+    r'(?P<drop>OUTPUT_DROP|INPUT_DROP|FORWARD_DROP|REJECT)'
+    r'|(?P<accept>ACCEPT|ALLOW)'
+    r'|(?P<addr>SRC=|DST=)(?P<ip>[\d.]+)'
+    r'|(?P<pkey>PROTO=)(?P<proto>\w+)'
+    r'|(?P<key>IN=|OUT=|SPT=|DPT=|LEN=|TOS=|TTL=|ID=)'
+)
+
+
+REPEATS = {sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT, getattr(sre_parse, 'POSSESSIVE_REPEAT', None)}
+BACKREFERENCES = {sre_parse.GROUPREF, sre_parse.GROUPREF_EXISTS}
+
+
+def check_backtracking(parsed, name, state=None):
+    """Recusa o que pode levar a backtracking catastrófico: retrovisores, mais de um
+    quantificador ilimitado no padrão (.*.*, (a+)+) e alternativas ou trechos opcionais
+    dentro de uma repetição ((a|aa)+, (a?b)*). Repetições limitadas simples
+    ((?:\\d{1,3}\\.){3}) passam.
+
+    `state` guarda quantos quantificadores ilimitados já apareceram e se o trecho está
+    dentro de uma repetição.
+    """
+    if state is None:
+        state = {'unbounded': 0, 'repeated': False}
+    for op, av in parsed:
+        if op in BACKREFERENCES:
+            raise ValueError(f"{name}: backreferences are not allowed")
+        if op in REPEATS:
+            low, high, sub = av
+            if state['repeated'] and low == 0:
+                raise ValueError(f"{name}: optional parts inside a repetition are not allowed")
+            if high == sre_parse.MAXREPEAT:
+                state['unbounded'] += 1
+                if state['unbounded'] > 1:
+                    raise ValueError(f"{name}: only one unbounded quantifier (*, +, {{n,}}) is allowed")
+            if high > 1:
+                outer, state['repeated'] = state['repeated'], True
+                check_backtracking(sub, name, state)
+                state['repeated'] = outer
+            else:
+                check_backtracking(sub, name, state)
+        elif op == sre_parse.SUBPATTERN:
+            check_backtracking(av[-1], name, state)
+        elif op == sre_parse.BRANCH:
+            if state['repeated']:
+                raise ValueError(f"{name}: alternation inside a repetition is not allowed")
+            for branch in av[1]:
+                check_backtracking(branch, name, state)
+        elif op in (sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+            check_backtracking(av[1], name, state)
+        elif op == getattr(sre_parse, 'ATOMIC_GROUP', None):
+            check_backtracking(av, name, state)
+
+
+def compile_pattern(value, name):
+    if len(value) > MAX_PATTERN:
+        raise ValueError(f"{name}: pattern longer than {MAX_PATTERN} characters")
+    try:
+        check_backtracking(sre_parse.parse(value), name)
+        return re.compile(value)
+    except re.error as e:
+        raise ValueError(f"{name}: {e}")
+
+
+class LogFilter:
+    """Filtro compilado; `accepts` decide linha a linha e `highlight` gera o HTML."""
+
+    def __init__(self, include=None, exclude=None, severity=None, prefixes=()):
+        self.include = compile_pattern(include, 'include') if include else None
+        self.exclude = compile_pattern(exclude, 'exclude') if exclude else None
+        self.severity = re.compile(SEVERITY_PATTERNS[severity], re.IGNORECASE) if severity else None
+        self.prefix = re.compile(r'\b(?:' + '|'.join(map(re.escape, prefixes)) + r')\b') if prefixes else None
+        self.active = any((self.include, self.exclude, self.severity, self.prefix))
+
+    def accepts(self, line):
+        if self.prefix and not self.prefix.search(line):
+            return False
+        if self.severity and not self.severity.search(line):
+            return False
+        head = line[:MAX_MATCH_LINE]
+        if self.include and not self.include.search(head):
+            return False
+        if self.exclude and self.exclude.search(head):
+            return False
+        return True
+
+    def accepts_bytes(self, line):
+        return self.accepts(line.decode('utf-8', errors='replace'))
+
+    def apply(self, lines):
+        if not self.active:
+            return list(lines)
+        return [line for line in lines if self.accepts(line)]
+
+    def highlight(self, line):
+        # As cores são calculadas na linha inteira; os trechos que casam com "include"
+        # são marcados dentro de cada trecho colorido, sem quebrar os tokens.
+        if not self.include:
+            return colorize(line)
+        marks = [match.span() for match in self.include.finditer(line[:MAX_MATCH_LINE])
+                 if match.end() > match.start()]
+        return colorize(line, marks)
+
+    def render(self, lines):
+        return ''.join(f'<span class="log-line">{self.highlight(line)}\n</span>' for line in lines)
+
+
+def color_segments(text):
+    """Trechos (início, fim, classe CSS ou None) que cobrem a linha, em ordem."""
+    segments, pos = [], 0
+    for match in RE_HIGHLIGHT.finditer(text):
+        if match.start() > pos:
+            segments.append((pos, match.start(), None))
+        if match.group('drop'):
+            segments.append((*match.span(), 'highlight-drop'))
+        elif match.group('accept'):
+            segments.append((*match.span(), 'highlight-accept'))
+        elif match.group('addr'):
+            css = 'highlight-src' if match.group('addr') == 'SRC=' else 'highlight-dst'
+            segments.append((*match.span('addr'), 'highlight-key'))
+            segments.append((*match.span('ip'), css))
+        elif match.group('pkey'):
+            segments.append((*match.span('pkey'), 'highlight-key'))
+            segments.append((*match.span('proto'), 'highlight-proto'))
+        else:
+            segments.append((*match.span(), 'highlight-key'))
+        pos = match.end()
+    if pos < len(text):
+        segments.append((pos, len(text), None))
+    return segments
+
+
+def colorize(text, marks=()):
+    """HTML da linha com as cores; os intervalos de `marks` (ordenados) ficam em <mark>."""
+    out, index = [], 0
+    for start, end, css in color_segments(text):
+        while index < len(marks) and marks[index][1] <= start:
+            index += 1
+        parts, pos = [], start
+        for mark_start, mark_end in marks[index:]:
+            if mark_start >= end:
+                break
+            mark_start, mark_end = max(mark_start, start), min(mark_end, end)
+            parts.append(html.escape(text[pos:mark_start], quote=False))
+            parts.append(f'<mark class="highlight-match">{html.escape(text[mark_start:mark_end], quote=False)}</mark>')
+            pos = mark_end
+        parts.append(html.escape(text[pos:end], quote=False))
+        body = ''.join(parts)
+        out.append(f'<span class="{css}">{body}</span>' if css else body)
+    return ''.join(out)
+
+
+@functools.lru_cache(maxsize=FILTER_CACHE)
+def compile_filter(include=None, exclude=None, severity=None, prefixes=()):
+    return LogFilter(include, exclude, severity, prefixes)
+
+
+def filter_from_args(args):
+    """Monta o filtro a partir da query string; ValueError para parâmetros inválidos."""
+    severity = args.get('severity') or None
+    if severity and severity not in SEVERITY_PATTERNS:
+        raise ValueError(f"severity must be one of: {', '.join(SEVERITY_PATTERNS)}")
+    prefixes = tuple(sorted({p.strip() for p in args.get('prefix', '').split(',') if p.strip()}))
+    return compile_filter(args.get('include') or None, args.get('exclude') or None, severity, prefixes)
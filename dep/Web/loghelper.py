@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+import os
+import sys
+import grp
+import errno
+import socket
+import argparse
+import socketserver
+
+from logtail import open_binary
+
+# --- Abertura Privilegiada de Logs ---
+# Um processo root de longa duração abre apenas os arquivos da lista abaixo e
+# entrega o descritor já aberto ao painel pelo socket Unix (SCM_RIGHTS). O
+# painel lê e posiciona o arquivo diretamente, sem sudo e sem precisar do grupo
+# adm; reaberturas só acontecem na inicialização e após uma rotação.
+
+ALLOWED_LOGS = {
+    'nftables': '/var/log/nftables.log',
+    'syslog': '/var/log/syslog',
+    'auth': '/var/log/auth.log',
+}
+HELPER_SOCKET = '/run/spiral-loghelper.sock'
+HELPER_GROUP = 'adm'
+HELPER_TIMEOUT = 5
+MAX_REQUEST = 4096
+
+
+# --- Cliente (processo do painel) ---
+
+def open_via_helper(path, socket_path=None):
+    """Pede ao helper o descritor de `path`; levanta OSError se ele recusar ou não responder."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(HELPER_TIMEOUT)
+        sock.connect(socket_path or HELPER_SOCKET)
+        sock.sendall(path.encode() + b'\n')
+        msg, fds, _, _ = socket.recv_fds(sock, MAX_REQUEST, 1)
+    if fds:
+        return os.fdopen(fds[0], 'rb')
+    # Resposta de erro: "ERR <errno> <mensagem>".
+    _, code, message = (msg.decode(errors='replace').strip().split(' ', 2) + ['', ''])[:3]
+    code = int(code) if code.isdigit() else errno.EIO
+    raise OSError(code, message or os.strerror(code), path)
+
+
+def open_log(path):
+    """Abre o log pelo helper; sem helper (ou fora da lista dele) tenta a abertura direta."""
+    try:
+        return open_via_helper(path)
+    except OSError:
+        return open_binary(path)
+
+
+# --- Servidor (root) ---
+
+class HelperRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        self.request.settimeout(HELPER_TIMEOUT)
+        try:
+            path = self.rfile.readline(MAX_REQUEST).decode().strip()
+        except (OSError, UnicodeDecodeError):
+            return
+
+        if path not in self.server.allowed:
+            self.reply_error(errno.EACCES, 'log not allowed')
+            return
+        try:
+            fd = os.open(path, os.O_RDONLY | os.O_NOFOLLOW | os.O_CLOEXEC | os.O_NOCTTY)
+        except OSError as e:
+            self.reply_error(e.errno, e.strerror)
+            return
+        try:
+            socket.send_fds(self.request, [b'OK\n'], [fd])
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    def reply_error(self, code, message):
+        try:
+            self.request.sendall(f"ERR {code} {message}\n".encode())
+        except OSError:
+            pass
+
+
+class HelperServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, allowed):
+        self.allowed = frozenset(allowed)
+        super().__init__(socket_path, HelperRequestHandler)
+
+
+def run_helper(socket_path=None, group=HELPER_GROUP):
+    socket_path = socket_path or HELPER_SOCKET
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+
+    old_umask = os.umask(0o117)
+    try:
+        server = HelperServer(socket_path, ALLOWED_LOGS.values())
+    finally:
+        os.umask(old_umask)
+    try:
+        os.chown(socket_path, -1, grp.getgrnam(group).gr_gid)
+    except (KeyError, PermissionError) as e:
+        print(f"Aviso: não foi possível definir o grupo '{group}' em {socket_path}: {e}", file=sys.stderr)
+
+    print(f"Helper de logs escutando em {socket_path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Entrega descritores dos logs permitidos ao painel web.')
+    parser.add_argument('--socket', default=HELPER_SOCKET, help='Caminho do socket Unix.')
+    parser.add_argument('--group', default=HELPER_GROUP, help='Grupo com acesso ao socket (o do usuário do painel).')
+    args = parser.parse_args()
+    run_helper(args.socket, args.group)
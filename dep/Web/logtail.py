@@ -0,0 +1,343 @@
+import os
+import time
+import ctypes
+import ctypes.util
+import select
+import struct
+import threading
+from collections import deque
+
+# --- Leitura Incremental de Logs ---
+# Cursores no formato "<inode>:<offset>". O cliente devolve o cursor recebido
+# e o servidor retorna apenas os bytes anexados desde então.
+
+MAX_CHUNK = 256 * 1024
+TAIL_BLOCK = 8192
+# Com filtro, o tail volta no arquivo até achar as linhas pedidas ou ler este limite.
+TAIL_SCAN = 8 * 1024 * 1024
+
+
+def parse_cursor(value):
+    try:
+        inode, offset = value.split(':', 1)
+        return int(inode), int(offset)
+    except (AttributeError, ValueError):
+        return None
+
+
+def format_cursor(inode, offset):
+    return f"{inode}:{offset}"
+
+
+def open_binary(path):
+    return open(path, 'rb')
+
+
+class LogFollower:
+    """Mantém um descritor persistente do log e detecta rotação por inode."""
+
+    def __init__(self, path, opener=open_binary):
+        self.path = path
+        self._opener = opener
+        self._lock = threading.Lock()
+        self._file = None
+        self._inode = None
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+            self._file = None
+            self._inode = None
+
+    def _current(self):
+        # Retorna (fd, inode) do arquivo aberto e o inode atual do caminho.
+        with self._lock:
+            try:
+                path_inode = os.stat(self.path).st_ino
+            except FileNotFoundError:
+                path_inode = None
+            if self._file is None and path_inode is not None:
+                self._file = self._opener(self.path)
+                self._inode = os.fstat(self._file.fileno()).st_ino
+            if self._file is None:
+                raise FileNotFoundError(self.path)
+            return self._file.fileno(), self._inode, path_inode
+
+    def _switch(self, expected_inode):
+        # Troca para o arquivo novo após uma rotação (apenas uma vez por inode).
+        with self._lock:
+            if self._inode != expected_inode:
+                return
+            if self._file:
+                self._file.close()
+            self._file = self._opener(self.path)
+            self._inode = os.fstat(self._file.fileno()).st_ino
+
+    def start_cursor(self):
+        _, inode, _ = self._current()
+        return format_cursor(inode, 0)
+
+    @staticmethod
+    def _complete_lines(data, limit_hit):
+        # Evita enviar uma linha pela metade; o restante vem na próxima leitura.
+        cut = data.rfind(b'\n')
+        if cut == -1:
+            return data if limit_hit else b''
+        return data[:cut + 1]
+
+    def _current_after_rotation(self):
+        fd, inode, path_inode = self._current()
+        if path_inode is not None and path_inode != inode:
+            self._switch(inode)
+            fd, inode, _ = self._current()
+        return fd, inode
+
+    def tail(self, lines, keep=None):
+        if keep is not None:
+            return self.tail_matching(lines, keep)
+        fd, inode = self._current_after_rotation()
+
+        size = os.fstat(fd).st_size
+        pos = size
+        data = b''
+        while pos > 0 and data.count(b'\n') <= lines:
+            step = min(TAIL_BLOCK, pos)
+            pos -= step
+            data = os.pread(fd, step, pos) + data
+        data = self._complete_lines(data, False) if size else b''
+        end = pos + len(data)
+        content = b'\n'.join(data.split(b'\n')[-(lines + 1):])
+        return content, format_cursor(inode, end)
+
+    def tail_matching(self, lines, keep, max_scan=TAIL_SCAN):
+        """Como tail, mas retorna as últimas `lines` linhas aceitas por `keep(linha)`."""
+        fd, inode = self._current_after_rotation()
+
+        size = os.fstat(fd).st_size
+        pos = size
+        end = None
+        carry = b''
+        found = []
+        while pos > 0 and len(found) < lines and size - pos < max_scan:
+            step = min(MAX_CHUNK, pos)
+            pos -= step
+            parts = (os.pread(fd, step, pos) + carry).split(b'\n')
+            if end is None:
+                # A última linha sem quebra só é enviada na próxima leitura.
+                if len(parts) == 1 and pos > 0:
+                    carry = parts[0]
+                    continue
+                end = size - len(parts.pop())
+            # O primeiro pedaço pode ser o fim de uma linha que começa antes de `pos`.
+            carry = parts.pop(0) if pos > 0 else b''
+            found[:0] = [line for line in parts if line and keep(line)]
+        if end is None:
+            end = pos if size == 0 else size
+        content = b''.join(line + b'\n' for line in found[-lines:]) if lines else b''
+        return content, format_cursor(inode, end)
+
+    def read_since(self, cursor, max_bytes=MAX_CHUNK):
+        """Retorna (dados, novo_cursor, reset). reset indica que o cliente deve descartar o que tem."""
+        parsed = parse_cursor(cursor)
+        fd, inode, path_inode = self._current()
+        if parsed is None:
+            return None
+
+        cur_inode, offset = parsed
+        rotated = path_inode is not None and path_inode != inode
+
+        if cur_inode != inode:
+            return None
+
+        size = os.fstat(fd).st_size
+        truncated = offset > size
+        if truncated:
+            # Arquivo truncado no mesmo inode (copytruncate): o cliente recomeça do zero.
+            offset = 0
+
+        if offset < size:
+            raw = os.pread(fd, min(max_bytes, size - offset), offset)
+            data = self._complete_lines(raw, len(raw) >= max_bytes)
+            if data or not rotated:
+                return data, format_cursor(inode, offset + len(data)), truncated
+
+        if rotated:
+            # O arquivo antigo foi consumido por completo; continua no novo desde o início.
+            self._switch(inode)
+            _, new_inode, _ = self._current()
+            return self.read_since(format_cursor(new_inode, 0), max_bytes)
+
+        return b'', format_cursor(inode, offset), truncated
+
+
+class FollowerRegistry:
+    def __init__(self, paths, opener=open_binary):
+        self._followers = {name: LogFollower(path, opener) for name, path in paths.items()}
+        self._broadcasters = {}
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        return self._followers.get(name)
+
+    def broadcaster(self, name):
+        with self._lock:
+            if name not in self._broadcasters:
+                self._broadcasters[name] = LogBroadcaster(self._followers[name])
+            return self._broadcasters[name]
+
+    def read(self, name, cursor, lines, keep=None):
+        follower = self._followers[name]
+        result = follower.read_since(cursor) if cursor else None
+        if result is None:
+            data, new_cursor = follower.tail(lines, keep)
+            return data, new_cursor, True
+        if keep is not None:
+            data, new_cursor, reset = result
+            data = b''.join(line + b'\n' for line in data.split(b'\n') if line and keep(line))
+            return data, new_cursor, reset
+        return result
+
+
+# --- Transmissão ao Vivo (fan-out) ---
+# Um único leitor por log acompanha o arquivo via inotify e distribui as linhas
+# novas para filas limitadas por cliente; clientes lentos perdem as mais antigas.
+
+SUBSCRIBER_QUEUE = 1000
+POLL_INTERVAL = 1.0
+
+IN_MODIFY = 0x00000002
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+
+
+class Inotify:
+    def __init__(self, directory):
+        libc_name = ctypes.util.find_library('c')
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        wd = libc.inotify_add_watch(self.fd, directory.encode(), IN_MODIFY | IN_CREATE | IN_MOVED_TO)
+        if wd < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), f'inotify_add_watch failed for {directory}')
+
+    def wait(self, names, timeout):
+        # Bloqueia até um evento citar um dos nomes observados ou o tempo esgotar.
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            readable, _, _ = select.select([self.fd], [], [], remaining)
+            if not readable:
+                return False
+            try:
+                buf = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                continue
+            pos = 0
+            while pos + 16 <= len(buf):
+                _, _, _, length = struct.unpack_from('iIII', buf, pos)
+                if buf[pos + 16:pos + 16 + length].rstrip(b'\0') in names:
+                    return True
+                pos += 16 + length
+
+    def close(self):
+        os.close(self.fd)
+
+
+class Subscription:
+    def __init__(self, maxlen=SUBSCRIBER_QUEUE, keep=None):
+        self._lines = deque(maxlen=maxlen)
+        self._cond = threading.Condition()
+        self._keep = keep
+        self.dropped = 0
+
+    def put(self, lines):
+        with self._cond:
+            overflow = len(self._lines) + len(lines) - self._lines.maxlen
+            if overflow > 0:
+                self.dropped += overflow
+            self._lines.extend(lines)
+            self._cond.notify()
+
+    def get(self, timeout):
+        # O filtro roda aqui, na thread do próprio cliente, e não na do leitor
+        # compartilhado: um padrão lento atrasa apenas o stream de quem o pediu.
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._cond:
+                if not self._lines:
+                    self._cond.wait(max(0, deadline - time.monotonic()))
+                lines = list(self._lines)
+                self._lines.clear()
+            if self._keep is not None:
+                lines = [line for line in lines if self._keep(line)]
+            if lines or time.monotonic() >= deadline:
+                return lines
+
+
+class LogBroadcaster:
+    def __init__(self, follower):
+        self.follower = follower
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def subscribe(self, keep=None):
+        sub = Subscription(keep=keep)
+        with self._lock:
+            self._subscribers.add(sub)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f'log-reader:{self.follower.path}', daemon=True)
+                self._thread.start()
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def _publish(self, data):
+        lines = data.decode('utf-8', errors='replace').splitlines()
+        if not lines:
+            return
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for sub in subscribers:
+            sub.put(lines)
+
+    def _run(self):
+        directory, name = os.path.split(self.follower.path)
+        try:
+            watcher = Inotify(directory)
+        except OSError:
+            watcher = None
+
+        cursor = None
+        try:
+            while True:
+                with self._lock:
+                    if not self._subscribers:
+                        self._thread = None
+                        return
+                try:
+                    result = self.follower.read_since(cursor) if cursor else None
+                    if result is None:
+                        _, cursor = self.follower.tail(0)
+                    else:
+                        data, cursor, _ = result
+                        self._publish(data)
+                        if len(data) >= MAX_CHUNK // 2:
+                            continue
+                except FileNotFoundError:
+                    cursor = None
+
+                if watcher:
+                    watcher.wait({name.encode()}, POLL_INTERVAL)
+                else:
+                    time.sleep(POLL_INTERVAL)
+        finally:
+            if watcher:
+                watcher.close()
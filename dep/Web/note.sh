@@ -5,6 +5,23 @@ apt-get install python3 python3-pip python3-venv
 mkdir web-gui && cd web-gui
 python3 -m venv venv
 source venv/bin/activate
-pip3 install Flask Flask-Login Flask-Session
+pip3 install Flask Flask-Login waitress
+
+# Os logs são abertos pelo loghelper.py (root, systemd/loghelper.service), que entrega
+# os descritores pelo socket /run/spiral-loghelper.sock; o usuário do painel precisa
+# apenas do grupo do socket (--group). Sem o helper, os logs são abertos diretamente.
+# usermod -aG adm <usuario>
+# A API do handler.py --daemon (/run/dns-handler.sock) pertence ao grupo spiral-dns, criado
+# pelo systemd/dns-handler.service; inclua nele apenas o usuário do painel.
+# usermod -aG spiral-dns <usuario>
+
+# Serve com o waitress (threads) quando instalado; teste de carga dos logs:
+# python3 loadtest.py --url http://127.0.0.1:5000 --log syslog --clients 50 --password <senha>
+
+# Métricas do Prometheus em /metrics (inclui as fases do handler.py --daemon): exigem
+# "Authorization: Bearer <token>". Sem proxy reverso local, ALLOW_LOCAL=1 dispensa o
+# token para 127.0.0.1.
+# export SPIRAL_METRICS_TOKEN=<token>
+# export SPIRAL_METRICS_ALLOW_LOCAL=1
 
 python3 app.py
\ No newline at end of file
@@ -0,0 +1,215 @@
+import os
+import json
+import time
+import secrets
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+from atomicio import file_lock
+
+# --- Sessões e Usuários em SQLite ---
+# Substitui os arquivos do Flask-Session (um por sessão, nunca apagados) e o
+# dicionário global de usuários. O banco usa WAL, então vários workers podem
+# compartilhar o mesmo arquivo; a expiração é indexada e limpa periodicamente.
+
+SESSION_IDLE = 12 * 3600
+EVICT_INTERVAL = 600
+USER_CACHE_TTL = 30
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    expires REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions(expires);
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    password_hash TEXT NOT NULL
+);
+"""
+
+
+class Database:
+    def __init__(self, path):
+        self.path = path
+        with self.connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+        # Guarda hashes de senha: legível só pelo serviço.
+        os.chmod(path, 0o600)
+
+    @contextmanager
+    def connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute('PRAGMA synchronous=NORMAL')
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+
+# --- Sessões ---
+
+class SqliteSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, sid=None, expires=0, new=False):
+        def on_update(session):
+            session.modified = True
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.expires = expires
+        self.new = new
+        self.modified = False
+
+
+class SqliteSessionInterface(SessionInterface):
+    """Sessões no servidor; o cookie leva apenas um identificador aleatório."""
+
+    serializer = TaggedJSONSerializer()
+
+    def __init__(self, db, idle=SESSION_IDLE):
+        self.db = db
+        self.idle = idle
+        self._last_evict = 0
+        self._evict_lock = threading.Lock()
+
+    def _new_session(self):
+        return SqliteSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def open_session(self, app, request):
+        self.evict_expired()
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if not sid:
+            return self._new_session()
+        with self.db.connect() as conn:
+            row = conn.execute('SELECT data, expires FROM sessions WHERE id = ? AND expires > ?',
+                               (sid, time.time())).fetchone()
+        if row is None:
+            return self._new_session()
+        try:
+            data = self.serializer.loads(row[0])
+        except ValueError:
+            return self._new_session()
+        return SqliteSession(data, sid=sid, expires=row[1])
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if not session:
+            if not session.new:
+                self.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        now = time.time()
+        # Sessões sem alteração só são regravadas quando passaram da metade da validade.
+        if not session.modified and session.expires - now > self.idle / 2:
+            return
+        expires = now + self.idle
+        with self.db.connect() as conn:
+            conn.execute('INSERT OR REPLACE INTO sessions (id, data, expires) VALUES (?, ?, ?)',
+                         (session.sid, self.serializer.dumps(dict(session)), expires))
+        session.expires = expires
+
+        response.set_cookie(
+            name, session.sid,
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
+
+    def regenerate(self, session):
+        """Troca o identificador da sessão (após o login), evitando fixação de sessão."""
+        if not session.new:
+            self.delete(session.sid)
+        session.sid = secrets.token_urlsafe(32)
+        session.modified = True
+
+    def delete(self, sid):
+        with self.db.connect() as conn:
+            conn.execute('DELETE FROM sessions WHERE id = ?', (sid,))
+
+    def evict_expired(self, force=False):
+        now = time.time()
+        if not force and now - self._last_evict < EVICT_INTERVAL:
+            return 0
+        if not self._evict_lock.acquire(blocking=False):
+            return 0
+        try:
+            self._last_evict = now
+            with self.db.connect() as conn:
+                return conn.execute('DELETE FROM sessions WHERE expires <= ?', (now,)).rowcount
+        finally:
+            self._evict_lock.release()
+
+
+# --- Usuários ---
+
+class UserStore:
+    """Usuários do painel, com cache curto das consultas feitas a cada requisição."""
+
+    def __init__(self, db):
+        self.db = db
+        self._cache = {}
+        self._lock = threading.Lock()
+        self._has_users = False
+
+    def get(self, username):
+        now = time.time()
+        with self._lock:
+            cached = self._cache.get(username)
+            if cached and cached[0] > now:
+                return cached[1]
+        with self.db.connect() as conn:
+            row = conn.execute('SELECT name, password_hash FROM users WHERE username = ?',
+                               (username,)).fetchone()
+        if row is None:
+            return None
+        user = {'name': row[0], 'password_hash': row[1]}
+        with self._lock:
+            self._cache[username] = (now + USER_CACHE_TTL, user)
+        return user
+
+    def set(self, username, name, password_hash):
+        with self.db.connect() as conn:
+            conn.execute('INSERT OR REPLACE INTO users (username, name, password_hash) VALUES (?, ?, ?)',
+                         (username, name, password_hash))
+        with self._lock:
+            self._cache.pop(username, None)
+
+    def has_users(self):
+        # Depois do setup sempre existe um usuário; só a resposta positiva fica em cache.
+        if not self._has_users:
+            with self.db.connect() as conn:
+                self._has_users = conn.execute('SELECT 1 FROM users LIMIT 1').fetchone() is not None
+        return self._has_users
+
+    def import_json(self, path):
+        """Migra os usuários do config.json antigo; o arquivo é renomeado depois."""
+        # Com vários workers apenas um faz a migração.
+        with file_lock(path):
+            if not os.path.exists(path):
+                return 0
+            with open(path, 'r') as f:
+                users = json.load(f)
+            with self.db.connect() as conn:
+                conn.executemany(
+                    'INSERT OR IGNORE INTO users (username, name, password_hash) VALUES (?, ?, ?)',
+                    [(username, data['name'], data['password_hash']) for username, data in users.items()],
+                )
+            os.replace(path, path + '.migrated')
+        with self._lock:
+            self._cache.clear()
+        return len(users)
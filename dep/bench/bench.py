@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+import os
+import io
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import statistics
+import contextlib
+import subprocess
+from datetime import datetime, timezone
+
+# ================= CONFIGURATION =================
+REPO_DEP = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Timings are machine-specific, so the history lives outside the source tree.
+HISTORY_FILE = os.path.join(os.environ.get("XDG_STATE_HOME") or os.path.expanduser("~/.local/state"),
+                            "spiral-bench", "history.jsonl")
+ZONE_SIZES = (10_000, 100_000)
+QUICK_ZONE_SIZES = (10_000,)
+LOG_SIZE = 64 * 1024 * 1024     # bytes of generated syslog for the log read cases
+REPEAT = 5
+BASELINE_RUNS = 5               # a case is compared with the median of its last N recorded runs
+REGRESSION_THRESHOLD = 1.25     # ...and flagged when it is this much slower
+# =================================================
+
+# Stand-ins for the BIND and systemd tools: they accept the same arguments and
+# do the minimum the handler relies on (key files, a .signed zone).
+STAND_INS = {
+    "named-checkzone": "#!/bin/sh\nexit 0\n",
+    "named-checkconf": "#!/bin/sh\nexit 0\n",
+    "rndc": "#!/bin/sh\nexit 0\n",
+    "systemctl": "#!/bin/sh\nexit 0\n",
+    "dnssec-settime": "#!/bin/sh\nexit 0\n",
+    "dnssec-signzone": """#!/bin/sh
+for zone; do :; done
+cp "$zone" "$zone.signed"
+echo "x. 3600 IN RRSIG A 13 2 3600 20991231000000 20240101000000 1234 x. AAAA" >> "$zone.signed"
+""",
+    "dnssec-keygen": """#!/bin/sh
+dir=.; flags=256
+while [ $# -gt 1 ]; do
+    case "$1" in -K) dir=$2; shift;; -f) flags=257; shift;; -P|-A|-a|-n) shift;; esac
+    shift
+done
+tag=$(( $$ % 60000 + 1000 + flags ))
+now=$(date -u +%Y%m%d%H%M%S)
+printf '; Created: %s\\n; Publish: %s\\n; Activate: %s\\n%s. 3600 IN DNSKEY %s 3 13 AAAA\\n' $now $now $now "$1" $flags > "$dir/K$1.+013+$tag.key"
+printf 'Created: %s\\nPublish: %s\\nActivate: %s\\n' $now $now $now > "$dir/K$1.+013+$tag.private"
+echo "K$1.+013+$tag"
+""",
+}
+
+def parse_arguments():
+    epilog_text = """EXAMPLES:
+  1. Run every case and append the results to the history file:
+     ./bench.py
+
+  2. Quick run (10k-record zones only), DNS cases only:
+     ./bench.py --quick --cases dns.
+
+  3. CI gate: exit with status 1 if any case regressed:
+     ./bench.py --fail-on-regression
+"""
+    parser = argparse.ArgumentParser(
+        description="Benchmarks for the DNS handler and the web log readers, with a result history.",
+        epilog=epilog_text,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--cases", help="Only run cases whose name starts with this prefix.")
+    parser.add_argument("--quick", action="store_true", help="Skip the 100k-record zones.")
+    parser.add_argument("--repeat", type=int, default=REPEAT, help=f"Timed runs per case (default: {REPEAT}).")
+    parser.add_argument("--history", default=HISTORY_FILE,
+                        help=f"JSON lines file with previous results (default: {HISTORY_FILE}).")
+    parser.add_argument("--no-save", action="store_true", help="Do not append this run to the history.")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help=f"Slowdown factor flagged as a regression (default: {REGRESSION_THRESHOLD}).")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit with status 1 on a regression.")
+    return parser.parse_args()
+
+# ================= FIXTURES =================
+
+class Workspace:
+    """Temporary BIND/log tree; the handler's paths are pointed at it."""
+
+    def __init__(self):
+        self.root = tempfile.mkdtemp(prefix="spiral-bench-")
+        self.bin = os.path.join(self.root, "bin")
+        self.etc = os.path.join(self.root, "etc")
+        for path in (self.bin, self.etc, os.path.join(self.etc, "zones"), os.path.join(self.etc, "keys"),
+                     os.path.join(self.root, "state")):
+            os.makedirs(path)
+        for name, script in STAND_INS.items():
+            path = os.path.join(self.bin, name)
+            with open(path, "w") as f:
+                f.write(script)
+            os.chmod(path, 0o755)
+        os.environ["PATH"] = self.bin + os.pathsep + os.environ["PATH"]
+
+    def path(self, *parts):
+        return os.path.join(self.root, *parts)
+
+    def close(self):
+        subprocess.run(["rm", "-rf", self.root])
+
+def load_handler(ws):
+    sys.path.insert(0, os.path.join(REPO_DEP, "DNS"))
+    import handler
+    import pwd
+    import grp
+    handler.NAMED_CONF_LOCAL = ws.path("etc", "named.conf.local")
+    handler.NAMED_CONF_OPTIONS = ws.path("etc", "named.conf.options")
+    handler.KEYS_DIR = ws.path("etc", "keys")
+    handler.STATE_DIR = ws.path("state")
+    handler.BIND_USER = pwd.getpwuid(os.getuid()).pw_name
+    handler.BIND_GROUP = grp.getgrgid(os.getgid()).gr_name
+    handler.get_bind_uid_gid.cache_clear()
+    return handler
+
+def write_zone(path, domain, records):
+    with open(path, "w") as f:
+        f.write(f"$TTL    86400\n@       IN      SOA     ns1.{domain}. admin.{domain}. (\n"
+                "                        2024010100 ; Serial\n                        3600       ; Refresh\n"
+                "                        1800       ; Retry\n                        604800     ; Expire\n"
+                "                        86400      ; Minimum TTL\n                )\n"
+                f"        IN      NS      ns1.{domain}.\nns1     IN      A       10.0.0.1\n\n; Zone records\n")
+        for i in range(records):
+            f.write(f"host{i:06d}  IN      A       10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255} ; bench\n")
+
+def write_named_conf(ws, domain, zone_path):
+    with open(ws.path("etc", "named.conf.local"), "w") as f:
+        f.write(f'zone "{domain}" {{\n    type master;\n    file "{zone_path}.signed";\n}};\n')
+    with open(ws.path("etc", "named.conf.options"), "w") as f:
+        f.write('options {\n    directory "/var/cache/bind";\n    forwarders {\n        1.1.1.1;\n    };\n};\n')
+
+def write_log(path, size):
+    line = ("Jan 01 10:00:00 fw kernel: [123.456] INPUT_DROP: IN=vlan710 OUT= SRC=172.16.10.{i} "
+            "DST=172.16.10.254 LEN=60 PROTO=TCP SPT=51000 DPT={port} SYN\n")
+    chunk = "".join(line.format(i=i % 250, port=22 if i % 7 else 443) for i in range(10_000)).encode()
+    with open(path, "wb") as f:
+        for _ in range(max(1, size // len(chunk))):
+            f.write(chunk)
+
+# ================= CASES =================
+# Each case returns (setup, run): setup runs before every timed call and is not measured.
+
+def dns_cases(ws, sizes):
+    handler = load_handler(ws)
+    domain = "bench.local"
+    cases = {}
+    for size in sizes:
+        zone_path = ws.path("etc", "zones", f"db.{domain}.{size}")
+        records = [{"host": f"host{i:06d}", "type": "A", "value": f"192.168.{i >> 8 & 255}.{i & 255}", "comment": "u"}
+                   for i in range(0, size, max(1, size // 100))]
+        records += [{"host": f"new{i:03d}", "type": "A", "value": f"10.99.0.{i}", "comment": ""} for i in range(10)]
+
+        def fresh_zone(path=zone_path, size=size):
+            write_zone(path, domain, size)
+
+        cases[f"dns.update_zone_file[{size // 1000}k]"] = (
+            fresh_zone, lambda path=zone_path, records=records: handler.update_zone_file(path, records, []))
+        cases[f"dns.list_zone_records[{size // 1000}k]"] = (
+            fresh_zone, lambda path=zone_path: handler.list_zone_records(path))
+        cases[f"dns.export_zone_records[{size // 1000}k,json]"] = (
+            fresh_zone, lambda path=zone_path: handler.export_zone_records([(domain, path)], "json"))
+
+    # End to end through the stand-ins: keys, rewrite, sign, reload.
+    size = sizes[0]
+    zone_path = ws.path("etc", "zones", f"db.{domain}")
+    counter = iter(range(10**9))
+
+    def fresh_managed_zone():
+        write_zone(zone_path, domain, size)
+        write_named_conf(ws, domain, zone_path)
+
+    def manage():
+        n = next(counter)
+        handler.manage_zone(domain, zone_path, [{"host": "web", "type": "A", "value": f"10.1.{n >> 8 & 255}.{n & 255}", "comment": ""}])
+    cases[f"dns.manage_zone[{size // 1000}k]"] = (fresh_managed_zone, manage)
+
+    flip = iter(range(10**9))
+
+    def forwarders():
+        handler.manage_forwarders("set", "9.9.9.9,1.1.1.1" if next(flip) % 2 else "8.8.8.8,8.8.4.4")
+    cases["dns.forwarders.set"] = (lambda: write_named_conf(ws, domain, zone_path), forwarders)
+    return cases
+
+def log_cases(ws):
+    sys.path.insert(0, os.path.join(REPO_DEP, "Web"))
+    from logtail import FollowerRegistry
+    from logfilter import compile_filter
+
+    log_path = ws.path("syslog")
+    write_log(log_path, LOG_SIZE)
+    registry = FollowerRegistry({"syslog": log_path})
+    keep = compile_filter(None, None, None, ("INPUT_DROP",)).accepts_bytes
+    rare = compile_filter("DPT=443", None, None, ()).accepts_bytes
+    start = registry.get("syslog").start_cursor()
+
+    return {
+        "logs.tail[150]": (None, lambda: registry.read("syslog", None, 150)),
+        "logs.tail_filtered[150]": (None, lambda: registry.read("syslog", None, 150, rare)),
+        f"logs.read_all[{LOG_SIZE >> 20}MB]": (None, lambda: read_all(registry, start)),
+        f"logs.read_all_filtered[{LOG_SIZE >> 20}MB]": (None, lambda: read_all(registry, start, keep)),
+    } | web_cases(ws, log_path)
+
+def read_all(registry, cursor, keep=None):
+    # Whole file through the incremental reader, as a client catching up would.
+    while True:
+        _, new_cursor, _ = registry.read("syslog", cursor, 150, keep)
+        if new_cursor == cursor:
+            break
+        cursor = new_cursor
+
+def web_cases(ws, log_path):
+    """get_logs through Flask's test client; skipped when Flask is not installed."""
+    cwd = os.getcwd()
+    os.chdir(ws.root)
+    try:
+        import app as web
+        from werkzeug.security import generate_password_hash
+    except ImportError:
+        return {}
+    finally:
+        os.chdir(cwd)
+    # The panel database path is relative to the working directory it was opened from.
+    web.panel_db.path = os.path.join(ws.root, web.PANEL_DB)
+    web.ALLOWED_LOGS["syslog"] = log_path
+    web.log_followers = web.FollowerRegistry(web.ALLOWED_LOGS)
+    web.user_store.set("bench", "Bench", generate_password_hash("bench-password"))
+    client = web.app.test_client()
+    client.post("/login", data={"username": "bench", "password": "bench-password"})
+
+    def get_logs(requests=200):
+        for _ in range(requests):
+            response = client.get("/api/logs/syslog?format=html")
+            if response.status_code != 200:
+                raise RuntimeError(f"get_logs returned HTTP {response.status_code}")
+    return {"web.get_logs[x200]": (None, get_logs)}
+
+# ================= RUNNER & HISTORY =================
+
+def run_case(setup, func, repeat):
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+    times.sort()
+    return {
+        "min_ms": round(times[0] * 1000, 3),
+        "median_ms": round(statistics.median(times) * 1000, 3),
+        "max_ms": round(times[-1] * 1000, 3),
+    }
+
+def load_history(path):
+    runs = []
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            for line in f:
+                try:
+                    runs.append(json.loads(line))
+                except ValueError:
+                    continue
+    return runs
+
+def baseline(history, name):
+    medians = [run["results"][name]["median_ms"] for run in history if name in run.get("results", {})]
+    return statistics.median(medians[-BASELINE_RUNS:]) if medians else None
+
+def git_revision():
+    result = subprocess.run(["git", "-C", REPO_DEP, "rev-parse", "--short", "HEAD"], capture_output=True, text=True)
+    return result.stdout.strip() or None
+
+def main():
+    args = parse_arguments()
+    ws = Workspace()
+    try:
+        # Fixtures are only built for the groups the prefix can select.
+        wanted = lambda group: not args.cases or group.startswith(args.cases) or args.cases.startswith(group)
+        cases = dns_cases(ws, QUICK_ZONE_SIZES if args.quick else ZONE_SIZES) if wanted("dns.") else {}
+        if wanted("logs.") or wanted("web."):
+            cases.update(log_cases(ws))
+        if args.cases:
+            cases = {name: case for name, case in cases.items() if name.startswith(args.cases)}
+
+        history = load_history(args.history)
+        results, regressions = {}, []
+        print(f"{'CASE':<34} {'MEDIAN':>10} {'MIN':>10} {'BASELINE':>10}  ")
+        print("-" * 72)
+        for name, (setup, func) in cases.items():
+            result = run_case(setup, func, args.repeat)
+            results[name] = result
+            base = baseline(history, name)
+            flag = ""
+            if base and result["median_ms"] > base * args.threshold:
+                flag = f"REGRESSION x{result['median_ms'] / base:.2f}"
+                regressions.append(name)
+            base_text = f"{base:.1f}" if base else "-"
+            print(f"{name:<34} {result['median_ms']:>8.1f}ms {result['min_ms']:>8.1f}ms {base_text:>10}  {flag}")
+        print("-" * 72)
+    finally:
+        ws.close()
+
+    if not args.no_save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.history)), exist_ok=True)
+        with open(args.history, "a") as f:
+            f.write(json.dumps({
+                "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "revision": git_revision(),
+                "host": platform.node(),
+                "python": platform.python_version(),
+                "results": results,
+            }) + "\n")
+    if regressions:
+        print(f"Regressions: {', '.join(regressions)}")
+        if args.fail_on_regression:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
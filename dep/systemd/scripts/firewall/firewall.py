@@ -0,0 +1,672 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import time
+import bisect
+import hashlib
+import argparse
+import ipaddress
+import subprocess
+
+# ================= CONFIGURATION =================
+POLICY_FILE = "/root/.services/firewall/policy.json"
+RULESET_FILE = "/run/firelux.nft"
+NFT = "nft"
+FAMILY = "inet"
+PROTOCOLS = ("tcp", "udp")
+# =================================================
+
+# Base chains of the table: (type, hook, priority, policy), as created by a.sh.
+BASE_CHAINS = {
+    "input": ("filter", "input", "0", "drop"),
+    "output": ("filter", "output", "0", "drop"),
+    "forward": ("filter", "forward", "filter", "drop"),
+    "prerouting": ("nat", "prerouting", "0", "accept"),
+    "postrouting": ("nat", "postrouting", "srcnat", "accept"),
+}
+FILTER_CHAINS = ("input", "output", "forward")
+LOG_PREFIXES = {"input": "INPUT_DROP: ", "output": "OUTPUT_DROP: ", "forward": "FORWARD_DROP: "}
+
+def parse_arguments():
+    epilog_text = """EXAMPLES:
+  1. Compile the policy and load it in one atomic transaction:
+     ./firewall.py
+
+  2. Print the generated ruleset without touching the kernel:
+     ./firewall.py --print
+
+  3. Validate the generated ruleset with 'nft -c' only:
+     ./firewall.py --check
+
+  4. Boot: replace the whole ruleset (dynamic blacklists start empty):
+     ./firewall.py --flush-ruleset
+
+  5. Show the minimal changes against the live table without applying them:
+     ./firewall.py --diff
+
+  6. Compare incremental apply with a full rebuild on a scratch table:
+     ./firewall.py --bench
+"""
+    parser = argparse.ArgumentParser(
+        description="Compile the declarative firewall policy into a single nft ruleset.",
+        epilog=epilog_text,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--policy", default=POLICY_FILE, help=f"Policy file (default: {POLICY_FILE}).")
+    parser.add_argument("--wan", help="Uplink interface, overrides 'wan' in the policy.")
+    parser.add_argument("--output", default=RULESET_FILE, help=f"Where the compiled ruleset is written (default: {RULESET_FILE}).")
+    parser.add_argument("--flush-ruleset", action="store_true", help="Start the transaction with 'flush ruleset'.")
+    parser.add_argument("--no-sysctl", action="store_true", help="Do not apply the policy's sysctl settings.")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--print", action="store_true", help="Print the compiled ruleset and exit.")
+    mode.add_argument("--check", action="store_true", help="Compile and validate with 'nft -c' without loading.")
+    mode.add_argument("--diff", action="store_true", help="Print the changes needed against the live table and exit.")
+    mode.add_argument("--full", action="store_true", help="Flush and refill every chain instead of applying a diff.")
+    mode.add_argument("--bench", action="store_true", help="Time incremental apply against a full rebuild (scratch table).")
+    return parser.parse_args()
+
+# ================= RULESET MODEL =================
+
+class NamedSet:
+    """A named set or verdict map. Sets without `elements` are filled at runtime and never flushed."""
+
+    def __init__(self, name, type_, flags=(), elements=None, kind="set"):
+        self.name = name
+        self.type = type_
+        self.flags = tuple(flags)
+        self.elements = elements
+        self.kind = kind
+
+    @property
+    def dynamic(self):
+        return self.elements is None
+
+    def declaration(self):
+        body = f"type {self.type};"
+        if self.flags:
+            body += f" flags {', '.join(self.flags)};"
+        return f"{{ {body} }}"
+
+class Chain:
+    def __init__(self, name, hook=None):
+        self.name = name
+        self.hook = hook
+        self.rules = []
+
+    def add(self, rule_id, expr):
+        # Rule comments carry stable ids so a later diff can match live rules to policy rules.
+        if any(existing == rule_id for existing, _ in self.rules):
+            raise ValueError(f"duplicate rule id '{rule_id}' in chain '{self.name}'")
+        self.rules.append((rule_id, expr))
+
+    def declaration(self):
+        if not self.hook:
+            return ""
+        type_, hook, priority, policy = self.hook
+        return f" {{ type {type_} hook {hook} priority {priority}; policy {policy}; }}"
+
+class Ruleset:
+    def __init__(self, table):
+        self.table = table
+        self.sets = {}
+        self.chains = {name: Chain(name, hook) for name, hook in BASE_CHAINS.items()}
+
+    def add_set(self, named_set):
+        if named_set.name in self.sets:
+            raise ValueError(f"duplicate set '{named_set.name}'")
+        self.sets[named_set.name] = named_set
+        return named_set
+
+    def add_chain(self, name):
+        if name in self.chains:
+            raise ValueError(f"duplicate chain '{name}'")
+        self.chains[name] = Chain(name)
+        return self.chains[name]
+
+# ================= POLICY COMPILER =================
+
+def quote(name):
+    return f'"{name}"'
+
+def service_elements(policy, names, context):
+    """Expands service names to 'proto . port' set elements, keeping their order and dropping repeats."""
+    services = policy.get("services", {})
+    elements = []
+    for name in names:
+        if name not in services:
+            raise ValueError(f"{context}: unknown service '{name}'")
+        for proto, port in services[name]:
+            if proto not in PROTOCOLS:
+                raise ValueError(f"service '{name}': protocol must be one of {', '.join(PROTOCOLS)}")
+            if not isinstance(port, int) or not 0 < port < 65536:
+                raise ValueError(f"service '{name}': invalid port {port!r}")
+            element = f"{proto} . {port}"
+            if element not in elements:
+                elements.append(element)
+    return elements
+
+def compile_lists(policy, ruleset):
+    # Whitelists and blacklists are filled by other tools (IDS, DNS manager): dynamic sets.
+    for name, spec in policy.get("lists", {}).items():
+        flags = ("interval", "timeout") if spec.get("timeout") else ("interval",)
+        ruleset.add_set(NamedSet(name, "ipv4_addr", flags))
+        action = spec.get("action", "drop")
+        if action not in ("accept", "drop"):
+            raise ValueError(f"list '{name}': action must be accept or drop")
+        for chain in spec.get("chains", FILTER_CHAINS):
+            if chain not in FILTER_CHAINS:
+                raise ValueError(f"list '{name}': unknown chain '{chain}'")
+            field = "daddr" if chain == "output" else "saddr"
+            ruleset.chains[chain].add(name, f"ip {field} @{name} {action}")
+
+def compile_host(policy, ruleset):
+    host = policy.get("host", {})
+    ruleset.chains["input"].add("loopback", 'iif "lo" accept')
+    ruleset.chains["output"].add("loopback", 'oif "lo" accept')
+
+    icmp_types = host.get("icmp_types")
+    if icmp_types:
+        for chain in ("input", "output"):
+            ruleset.chains[chain].add("icmp", f"icmp type {{ {', '.join(icmp_types)} }} accept")
+
+    # One concatenated set lookup per direction instead of a rule per port.
+    for key, chain, match in (("input", "input", "dport"),
+                              ("output", "output", "dport"),
+                              ("output_replies", "output", "sport")):
+        elements = service_elements(policy, host.get(key, ()), f"host.{key}")
+        if elements:
+            set_name = f"host_{key}_services"
+            ruleset.add_set(NamedSet(set_name, "inet_proto . inet_service", elements=elements))
+            ruleset.chains[chain].add(set_name, f"meta l4proto . th {match} @{set_name} accept")
+
+def compile_zones(policy, ruleset, wan):
+    zones = policy.get("zones", {})
+    uplink = ruleset.add_set(NamedSet("zone_uplink", "ifname : verdict", elements=[], kind="map"))
+    masquerade = []
+
+    for name, zone in zones.items():
+        interfaces = zone.get("interfaces") or []
+        if not interfaces:
+            raise ValueError(f"zone '{name}': no interfaces")
+        subnet = zone.get("subnet")
+        if subnet:
+            try:
+                subnet = str(ipaddress.ip_network(subnet, strict=False))
+            except ValueError as e:
+                raise ValueError(f"zone '{name}': {e}")
+        if (zone.get("masquerade") or zone.get("snat")) and not subnet:
+            raise ValueError(f"zone '{name}': NAT needs a subnet")
+
+        if zone.get("masquerade"):
+            masquerade.append(subnet)
+        if zone.get("snat"):
+            ruleset.chains["postrouting"].add(
+                f"snat-{name}", f"oifname {quote(interfaces[0])} ip saddr {subnet} snat ip to {zone['snat']}")
+
+        # Traffic towards the uplink is dispatched by input interface through the verdict map.
+        if zone.get("open"):
+            verdict = "accept"
+        elif zone.get("icmp") or zone.get("services"):
+            chain = ruleset.add_chain(f"zone_{name}")
+            if zone.get("icmp"):
+                chain.add("icmp", "ip protocol icmp accept")
+            elements = service_elements(policy, zone.get("services", ()), f"zone '{name}'")
+            if elements:
+                set_name = f"zone_{name}_services"
+                ruleset.add_set(NamedSet(set_name, "inet_proto . inet_service", elements=elements))
+                chain.add(set_name, f"meta l4proto . th dport @{set_name} accept")
+            verdict = f"jump zone_{name}"
+        else:
+            continue
+        for interface in interfaces:
+            uplink.elements.append(f"{quote(interface)} : {verdict}")
+
+    if masquerade:
+        ruleset.add_set(NamedSet("masquerade_subnets", "ipv4_addr", ("interval",), elements=masquerade))
+        ruleset.chains["postrouting"].add(
+            "masquerade", f"oifname {quote(wan)} ip saddr @masquerade_subnets masquerade")
+    if uplink.elements:
+        ruleset.chains["forward"].add("zone-uplink", f"oifname {quote(wan)} iifname vmap @zone_uplink")
+
+def compile_custom(policy, ruleset):
+    for chain_name, rules in policy.get("rules", {}).items():
+        if chain_name not in ruleset.chains:
+            raise ValueError(f"rules: unknown chain '{chain_name}'")
+        for rule in rules:
+            ruleset.chains[chain_name].add(f"custom-{rule['id']}", rule["rule"])
+
+def compile_policy(policy, wan=None):
+    """Builds the Ruleset for `policy`. Raises ValueError on an inconsistent policy."""
+    wan = wan or policy.get("wan")
+    if not wan:
+        raise ValueError("no uplink interface: set 'wan' in the policy or pass --wan")
+    ruleset = Ruleset(policy.get("table", "firelux"))
+
+    for chain in FILTER_CHAINS:
+        ruleset.chains[chain].add("invalid", "ct state invalid drop")
+    compile_lists(policy, ruleset)
+    for chain in FILTER_CHAINS:
+        ruleset.chains[chain].add("established", "ct state established,related accept")
+    compile_host(policy, ruleset)
+    compile_zones(policy, ruleset, wan)
+    compile_custom(policy, ruleset)
+
+    log = policy.get("log")
+    if log:
+        limit = f"limit rate {log['rate']} burst {log.get('burst', 5)} packets " if log.get("rate") else ""
+        for chain in FILTER_CHAINS:
+            ruleset.chains[chain].add("log", f'{limit}log prefix "{LOG_PREFIXES[chain]}" level info')
+    return ruleset
+
+# ================= RENDERING & LOADING =================
+
+def rule_comment(rule_id, expr):
+    # "<id>#<digest>": the digest changes whenever the rule text does.
+    return f"{rule_id}#{hashlib.sha1(expr.encode()).hexdigest()[:8]}"
+
+def render(ruleset, flush_ruleset=False):
+    """Renders the ruleset as one nft script; 'nft -f' applies it as a single transaction.
+
+    Without flush_ruleset the table is kept: chains and compiler-owned sets are
+    flushed and refilled, while dynamic sets (blacklists) keep their elements.
+    """
+    target = f"{FAMILY} {ruleset.table}"
+    lines = ["#!/usr/sbin/nft -f", "# Generated by firewall.py from the firewall policy. Do not edit."]
+    if flush_ruleset:
+        lines.append("flush ruleset")
+    lines.append(f"add table {target}")
+
+    for named_set in ruleset.sets.values():
+        lines.append(f"add {named_set.kind} {target} {named_set.name} {named_set.declaration()}")
+    for chain in ruleset.chains.values():
+        lines.append(f"add chain {target} {chain.name}{chain.declaration()}")
+    for chain in ruleset.chains.values():
+        lines.append(f"flush chain {target} {chain.name}")
+
+    for named_set in ruleset.sets.values():
+        if named_set.dynamic:
+            continue
+        lines.append(f"flush {named_set.kind} {target} {named_set.name}")
+        if named_set.elements:
+            lines.append(f"add element {target} {named_set.name} {{ {', '.join(named_set.elements)} }}")
+
+    for chain in ruleset.chains.values():
+        for rule_id, expr in chain.rules:
+            lines.append(f'add rule {target} {chain.name} {expr} comment "{rule_comment(rule_id, expr)}"')
+    return "\n".join(lines) + "\n"
+
+def write_ruleset(path, content):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+def run_nft(args):
+    try:
+        result = subprocess.run([NFT] + args, capture_output=True, text=True)
+    except FileNotFoundError:
+        print(f"Error: '{NFT}' not found.")
+        sys.exit(1)
+    if result.returncode != 0:
+        print(f"Error: nft {' '.join(args)} failed:\n{result.stderr.strip()}")
+        sys.exit(1)
+    return result.stdout
+
+def apply_sysctl(settings):
+    if not settings:
+        return
+    run = subprocess.run(["sysctl", "-q", "-w"] + [f"{key}={value}" for key, value in settings.items()],
+                         capture_output=True, text=True)
+    if run.returncode != 0:
+        print(f"Error: Failed to apply kernel settings:\n{run.stderr.strip()}")
+        sys.exit(1)
+
+def load_policy(path):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Error: Cannot read policy {path}: {e}")
+        sys.exit(1)
+
+# ================= LIVE RULESET DIFF =================
+
+PRIORITY_NAMES = {"raw": -300, "mangle": -150, "dstnat": -100, "filter": 0, "security": 50, "srcnat": 100}
+
+def priority_value(priority):
+    priority = str(priority)
+    return PRIORITY_NAMES[priority] if priority in PRIORITY_NAMES else int(priority)
+
+def canonical_address(value):
+    # 10.0.0.1/32 and 10.0.0.1 are the same element.
+    try:
+        network = ipaddress.ip_network(value, strict=False)
+    except ValueError:
+        return value
+    return str(network.network_address) if network.prefixlen == network.max_prefixlen else str(network)
+
+def canonical_text(element):
+    """Canonical form of an element as written by the compiler ('tcp . 80', '"vlan710" : accept')."""
+    key, sep, value = element.replace('"', "").partition(" : ")
+    key = " . ".join(canonical_address(part) for part in key.split(" . "))
+    return f"{key} : {value}" if sep else key
+
+def canonical_json(value):
+    """Canonical form of a value from 'nft -j' output, comparable with canonical_text."""
+    if isinstance(value, list):
+        return f"{canonical_json(value[0])} : {canonical_json(value[1])}"
+    if isinstance(value, dict):
+        if "elem" in value:
+            return canonical_json(value["elem"]["val"])
+        if "prefix" in value:
+            return canonical_address(f"{value['prefix']['addr']}/{value['prefix']['len']}")
+        if "range" in value:
+            return "-".join(canonical_json(part) for part in value["range"])
+        if "concat" in value:
+            return " . ".join(canonical_json(part) for part in value["concat"])
+        for verdict in ("jump", "goto"):
+            if verdict in value:
+                return f"{verdict} {value[verdict]['target']}"
+        for verdict in ("accept", "drop", "continue", "return"):
+            if verdict in value:
+                return verdict
+    return canonical_address(str(value))
+
+def element_text(canonical, type_, key_only=False):
+    """nft syntax for a canonical element; interface names need quotes."""
+    key, sep, value = canonical.partition(" : ")
+    parts = key.split(" . ")
+    types = [part.strip() for part in type_.split(":")[0].split(".")]
+    key = " . ".join(quote(part) if kind == "ifname" else part for part, kind in zip(parts, types))
+    return f"{key} : {value}" if sep and not key_only else key
+
+def element_timeout(value):
+    # Keeps the remaining lifetime of elements in timeout sets (IDS punishment).
+    if isinstance(value, dict) and "elem" in value and value["elem"].get("expires"):
+        return f" timeout {int(value['elem']['expires'])}s"
+    return ""
+
+class LiveTable:
+    """The live table as reported by 'nft -j list ruleset'."""
+
+    def __init__(self, table, items):
+        self.chains = {}
+        self.rules = {}
+        self.sets = {}
+        for item in items:
+            kind, body = next(iter(item.items()))
+            if not isinstance(body, dict) or body.get("table") != table or body.get("family") != FAMILY:
+                continue
+            if kind == "chain":
+                hook = None
+                if "hook" in body:
+                    hook = (body.get("type"), body["hook"], priority_value(body.get("prio", 0)), body.get("policy", "accept"))
+                self.chains[body["name"]] = hook
+                self.rules.setdefault(body["name"], [])
+            elif kind == "rule":
+                self.rules.setdefault(body["chain"], []).append((body["handle"], body.get("comment")))
+            elif kind in ("set", "map"):
+                type_ = body["type"]
+                type_ = " . ".join(type_) if isinstance(type_, list) else type_
+                if kind == "map":
+                    type_ = f"{type_} : {body['map']}"
+                elements = {}
+                for value in body.get("elem", []):
+                    elements[canonical_json(value)] = element_timeout(value)
+                self.sets[body["name"]] = {
+                    "kind": kind,
+                    "type": type_,
+                    "flags": tuple(sorted(body.get("flags", []))),
+                    "elements": elements,
+                }
+
+def read_live_table(table):
+    """Returns the LiveTable, or None when the table does not exist yet."""
+    output = run_nft(["-j", "list", "ruleset"])
+    items = json.loads(output).get("nftables", [])
+    if not any("table" in item and item["table"].get("name") == table and item["table"].get("family") == FAMILY
+               for item in items):
+        return None
+    return LiveTable(table, items)
+
+def longest_increasing(indexes):
+    """Positions of a longest strictly increasing subsequence of `indexes`."""
+    tails, tails_pos, previous = [], [], [None] * len(indexes)
+    for pos, value in enumerate(indexes):
+        i = bisect.bisect_left(tails, value)
+        if i == len(tails):
+            tails.append(value)
+            tails_pos.append(pos)
+        else:
+            tails[i] = value
+            tails_pos[i] = pos
+        previous[pos] = tails_pos[i - 1] if i else None
+    keep, pos = set(), tails_pos[-1] if tails_pos else None
+    while pos is not None:
+        keep.add(pos)
+        pos = previous[pos]
+    return keep
+
+def diff_chain(target, chain, live_rules):
+    """Returns (deletes, inserts) turning the live rule list into the desired one.
+
+    Live rules whose comment is in the policy and already in the right relative
+    order are kept; everything else is deleted, and missing rules are inserted
+    before the next kept rule (or appended) so their handles are never needed.
+    """
+    desired = [(rule_comment(rule_id, expr), expr) for rule_id, expr in chain.rules]
+    index = {comment: i for i, (comment, _) in enumerate(desired)}
+
+    candidates, seen = [], set()
+    deletes = []
+    for handle, comment in live_rules:
+        if comment in index and comment not in seen:
+            seen.add(comment)
+            candidates.append((handle, index[comment]))
+        else:
+            deletes.append(f"delete rule {target} {chain.name} handle {handle}")
+
+    keep = longest_increasing([i for _, i in candidates])
+    kept = {}
+    for pos, (handle, i) in enumerate(candidates):
+        if pos in keep:
+            kept[i] = handle
+        else:
+            deletes.append(f"delete rule {target} {chain.name} handle {handle}")
+
+    inserts = []
+    kept_order = sorted(kept)
+    for i, (comment, expr) in enumerate(desired):
+        if i in kept:
+            continue
+        after = bisect.bisect_right(kept_order, i)
+        rule = f'{expr} comment "{comment}"'
+        if after < len(kept_order):
+            inserts.append(f"insert rule {target} {chain.name} position {kept[kept_order[after]]} {rule}")
+        else:
+            inserts.append(f"add rule {target} {chain.name} {rule}")
+    return deletes, inserts
+
+def compatible(ruleset, live):
+    # Hooks, set types and flags cannot be changed in place.
+    for name, chain in ruleset.chains.items():
+        if name not in live.chains:
+            continue
+        wanted = None
+        if chain.hook:
+            type_, hook, priority, policy = chain.hook
+            wanted = (type_, hook, priority_value(priority), policy)
+        if live.chains[name] != wanted:
+            return False
+    for name, named_set in ruleset.sets.items():
+        current = live.sets.get(name)
+        if current and (current["kind"] != named_set.kind or current["type"] != named_set.type
+                        or current["flags"] != tuple(sorted(named_set.flags))):
+            return False
+    return True
+
+def plan_changes(ruleset, live):
+    """Minimal command list for `live` to match `ruleset`; None if only a rebuild can do it."""
+    if not compatible(ruleset, live):
+        return None
+    target = f"{FAMILY} {ruleset.table}"
+    declarations, rule_deletes, element_changes, rule_adds, removals = [], [], [], [], []
+
+    for named_set in ruleset.sets.values():
+        if named_set.name not in live.sets:
+            declarations.append(f"add {named_set.kind} {target} {named_set.name} {named_set.declaration()}")
+    for chain in ruleset.chains.values():
+        if chain.name not in live.chains:
+            declarations.append(f"add chain {target} {chain.name}{chain.declaration()}")
+
+    for chain in ruleset.chains.values():
+        deletes, inserts = diff_chain(target, chain, live.rules.get(chain.name, []))
+        rule_deletes += deletes
+        rule_adds += inserts
+
+    for named_set in ruleset.sets.values():
+        if named_set.dynamic:
+            continue
+        current = live.sets.get(named_set.name, {}).get("elements", {})
+        wanted = {canonical_text(element): element for element in named_set.elements}
+        stale = [element_text(c, named_set.type, key_only=True) for c in current if c not in wanted]
+        missing = [text for c, text in wanted.items() if c not in current]
+        if stale:
+            element_changes.append(f"delete element {target} {named_set.name} {{ {', '.join(stale)} }}")
+        if missing:
+            element_changes.append(f"add element {target} {named_set.name} {{ {', '.join(missing)} }}")
+
+    # Objects dropped from the policy go last, once nothing refers to them.
+    for name in live.chains:
+        if name not in ruleset.chains:
+            rule_deletes += [f"delete rule {target} {name} handle {handle}" for handle, _ in live.rules.get(name, [])]
+            removals.append(f"delete chain {target} {name}")
+    for name, current in live.sets.items():
+        if name not in ruleset.sets:
+            removals.append(f"delete {current['kind']} {target} {name}")
+
+    return declarations + rule_deletes + element_changes + rule_adds + removals
+
+def rebuild_script(ruleset, live):
+    """Full reload that recreates the table but carries over the dynamic sets' elements."""
+    target = f"{FAMILY} {ruleset.table}"
+    lines = [f"add table {target}", f"delete table {target}"]
+    lines += render(ruleset).splitlines()[2:]
+    for named_set in ruleset.sets.values():
+        current = live.sets.get(named_set.name) if live else None
+        if named_set.dynamic and current and current["elements"]:
+            elements = [element_text(c, named_set.type) + timeout for c, timeout in current["elements"].items()]
+            lines.append(f"add element {target} {named_set.name} {{ {', '.join(elements)} }}")
+    return "\n".join(lines) + "\n"
+
+def reconcile(ruleset, output, dry_run=False):
+    """Applies only what changed, in one 'nft -f' transaction. Returns the commands used."""
+    live = read_live_table(ruleset.table)
+    if live is None:
+        commands = render(ruleset).splitlines()[2:]
+    else:
+        commands = plan_changes(ruleset, live)
+        if commands is None:
+            print("Incompatible chain or set definitions: rebuilding the table.")
+            commands = rebuild_script(ruleset, live).splitlines()
+    if dry_run or not commands:
+        return commands
+    write_ruleset(output, "\n".join(commands) + "\n")
+    run_nft(["-f", output])
+    return commands
+
+# ================= BENCHMARK =================
+
+def scratch_ruleset(policy, wan, table):
+    # Same rules and sets in a table whose chains have no hooks, so no traffic is affected.
+    ruleset = compile_policy(dict(policy, table=table), wan)
+    for chain in ruleset.chains.values():
+        chain.hook = None
+        if chain.name in ("prerouting", "postrouting"):
+            # NAT statements are only valid in NAT chains.
+            chain.rules = []
+    return ruleset
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+def bench(policy, wan, output, rounds=5):
+    table = f"{policy.get('table', 'firelux')}_bench"
+    base = scratch_ruleset(policy, wan, table)
+    # A typical small edit: one more port for the first zone with services.
+    edited_policy = json.loads(json.dumps(policy))
+    zone = next(z for z in edited_policy.get("zones", {}).values() if z.get("services"))
+    edited_policy.setdefault("services", {})["bench-extra"] = [["tcp", 65001]]
+    zone["services"].append("bench-extra")
+    edited = scratch_ruleset(edited_policy, wan, table)
+
+    def full(ruleset):
+        write_ruleset(output, render(ruleset))
+        run_nft(["-f", output])
+
+    full_times, diff_times, diff_sizes = [], [], []
+    try:
+        full(base)
+        for _ in range(rounds):
+            elapsed, _ = timed(full, edited)
+            full_times.append(elapsed)
+            full(base)
+            elapsed, commands = timed(reconcile, edited, output)
+            diff_times.append(elapsed)
+            diff_sizes.append(len(commands))
+            reconcile(base, output)
+    finally:
+        subprocess.run([NFT, "delete", "table", FAMILY, table], capture_output=True)
+
+    rules = sum(len(chain.rules) for chain in base.chains.values())
+    print(f"Scratch table {FAMILY} {table}: {rules} rules, {len(base.sets)} sets/maps, {rounds} rounds")
+    print(f"Full rebuild:    median {sorted(full_times)[len(full_times) // 2] * 1000:.1f} ms "
+          f"({len(render(edited).splitlines()) - 2} commands)")
+    print(f"Incremental:     median {sorted(diff_times)[len(diff_times) // 2] * 1000:.1f} ms "
+          f"({max(diff_sizes)} commands, includes 'nft -j list ruleset')")
+
+def main():
+    args = parse_arguments()
+    policy = load_policy(args.policy)
+    try:
+        ruleset = compile_policy(policy, args.wan)
+    except (ValueError, KeyError, TypeError) as e:
+        print(f"Error: Invalid policy: {e}")
+        sys.exit(1)
+
+    if args.print:
+        print(render(ruleset, args.flush_ruleset), end="")
+        return
+    if args.check:
+        write_ruleset(args.output, render(ruleset, args.flush_ruleset))
+        run_nft(["-c", "-f", args.output])
+        print(f"Ruleset OK: {args.output}")
+        return
+    if args.bench:
+        bench(policy, args.wan or policy.get("wan"), args.output)
+        return
+    if args.diff:
+        commands = reconcile(ruleset, args.output, dry_run=True)
+        print("\n".join(commands) if commands else "No changes.")
+        return
+
+    if not args.no_sysctl:
+        apply_sysctl(policy.get("sysctl"))
+    if args.flush_ruleset or args.full:
+        write_ruleset(args.output, render(ruleset, args.flush_ruleset))
+        run_nft(["-f", args.output])
+        rules = sum(len(chain.rules) for chain in ruleset.chains.values())
+        print(f"Firewall loaded: {rules} rules, {len(ruleset.sets)} sets/maps in table {FAMILY} {ruleset.table}.")
+        return
+
+    commands = reconcile(ruleset, args.output)
+    if commands:
+        print(f"Firewall updated: {len(commands)} changes applied to table {FAMILY} {ruleset.table}.")
+    else:
+        print("Firewall already up to date (no changes).")
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,7 @@ set -e
 # Paths to the scripts
 NETWORK_SCRIPT="/root/.services/network.sh"
 FIREWALL_FOLDER="/root/.services/firewall"
+FIREWALL_POLICY="$FIREWALL_FOLDER/policy.json"
 
 set_printk() {
     local PARAM="kernel.printk"
@@ -59,7 +60,17 @@ ssh() {
 
 # Function to orchestrate the firewall levels
 firewall() {
-    # Array of firewall scripts
+    # Declarative policy: compiled and loaded as a single atomic nft transaction
+    if [[ -f "$FIREWALL_POLICY" ]]; then
+        python3 "$FIREWALL_FOLDER/firewall.py" --policy "$FIREWALL_POLICY" --flush-ruleset
+        if [[ $? -ne 0 ]]; then
+            printf "\e[31m*\e[0m Error: Failed to load firewall policy.\n"
+            exit 1
+        fi
+        return
+    fi
+
+    # Legacy: array of firewall scripts
     scripts=(
         "$FIREWALL_FOLDER/a.sh"
         "$FIREWALL_FOLDER/b.sh"